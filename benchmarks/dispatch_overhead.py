@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+handler分发的单请求开销基准测试：实例化handler、查找请求方法、选择解析器、取得过滤类和分页类，
+对比使用按类生成一次的分发计划与每个请求重新生成（即此前每个请求反射查找和导入的开销）
+
+    python benchmarks/dispatch_overhead.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rest_framework.core.request import Request  # noqa: E402
+from rest_framework.core.response import Response  # noqa: E402
+from rest_framework.core.views import RequestHandler  # noqa: E402
+from rest_framework.views.generics import GenericAPIHandler  # noqa: E402
+
+NUMBER = 20000
+BODY = b'{"name":"item","price":10}'
+
+
+class HelloHandler(RequestHandler):
+    async def get(self, *args, **kwargs):
+        return Response({"hello": "world"})
+
+    async def post(self, *args, **kwargs):
+        return Response(self.request_data)
+
+
+class ItemHandler(GenericAPIHandler):
+    async def get(self, *args, **kwargs):
+        return Response({"filters": len(self.load_filter_class), "paginated": self.paginator is not None})
+
+    async def post(self, *args, **kwargs):
+        return Response(self.request_data)
+
+
+def per_request(handler_class):
+    """
+    每次调用都重新生成分发计划的子类
+    """
+    class Handler(handler_class):
+        @classmethod
+        def get_dispatch_plan(cls):
+            return cls.build_dispatch_plan()
+
+    Handler.__name__ = handler_class.__name__
+    return Handler
+
+
+def make_scope(method, content_type=None):
+    headers = [(b"host", b"127.0.0.1:8000")]
+    if content_type:
+        headers.append((b"content-type", content_type))
+        headers.append((b"content-length", str(len(BODY)).encode()))
+    return {
+        "type": "http",
+        "scheme": "http",
+        "server": ("127.0.0.1", 8000),
+        "client": ("127.0.0.1", 50000),
+        "root_path": "",
+        "path": "/items",
+        "raw_path": b"/items",
+        "query_string": b"page=1",
+        "method": method,
+        "headers": headers,
+    }
+
+
+async def receive():
+    return {"type": "http.request", "body": BODY, "more_body": False}
+
+
+def call(view, scope):
+    # 整个过程没有真正挂起，直接驱动协程，不计入事件循环的调度开销
+    coro = view(Request(scope, receive))
+    try:
+        coro.send(None)
+    except StopIteration as e:
+        return e.value
+    raise RuntimeError("view suspended")
+
+
+def main():
+    requests = (
+        ("GET", make_scope("GET")),
+        ("POST json", make_scope("POST", b"application/json; charset=utf-8")),
+    )
+    for handler_class in (HelloHandler, ItemHandler):
+        print(handler_class.__name__)
+        for label, scope in requests:
+            for name, cls in (("per-request", per_request(handler_class)), ("plan", handler_class)):
+                view = cls.as_view(name=handler_class.__name__, application=None)
+                assert call(view, scope).status_code == 200
+                cost = timeit.timeit(lambda: call(view, scope), number=NUMBER) / NUMBER * 1e6
+                print("  {0:<10} {1:<12} {2:>8.3f} us".format(label, name, cost))
+
+
+if __name__ == "__main__":
+    main()
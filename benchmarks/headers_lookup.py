@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+请求头查找基准测试：20、40个头的请求上，每个请求做一组常见的头查找（包括不存在的可选头），
+对比逐个扫描列表与索引查找
+
+    python benchmarks/headers_lookup.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rest_framework.core import datastructures as ds  # noqa: E402
+
+NUMBER = 100000
+LOOKUPS = (
+    "Content-Type", "Accept", "Accept-Encoding", "Accept-Language", "User-Agent",
+    "If-None-Match", "Authorization", "X-Request-Id",
+)
+CONSTANT_LOOKUPS = (
+    ds.CONTENT_TYPE, ds.ACCEPT, ds.ACCEPT_ENCODING, ds.ACCEPT_LANGUAGE, ds.USER_AGENT,
+    ds.IF_NONE_MATCH, ds.AUTHORIZATION, ds.X_REQUEST_ID,
+)
+
+
+def make_headers(count):
+    headers = [
+        (b"host", b"api.example.com"),
+        (b"user-agent", b"Mozilla/5.0"),
+        (b"accept", b"application/json"),
+        (b"accept-encoding", b"gzip, deflate"),
+        (b"accept-language", b"zh-CN,zh;q=0.9"),
+    ]
+    for index in range(count - len(headers) - 1):
+        headers.append(("x-custom-header-{0}".format(index).encode(), b"value"))
+    headers.append((b"content-type", b"application/json"))
+    return headers
+
+
+def scan_get(raw_headers, key, default=None):
+    # 改为索引之前的实现：每次查找都转换key并逐个扫描
+    temp_key = key.lower().encode("latin-1")
+    for k, v in raw_headers:
+        if k == temp_key:
+            return v.decode("latin-1")
+    return default
+
+
+def main():
+    for count in (20, 40):
+        raw_headers = make_headers(count)
+
+        def scan():
+            for key in LOOKUPS:
+                scan_get(raw_headers, key)
+
+        def indexed():
+            headers = ds.Headers(raw_headers)
+            for key in LOOKUPS:
+                headers.get(key)
+
+        def indexed_constants():
+            headers = ds.Headers(raw_headers)
+            for key in CONSTANT_LOOKUPS:
+                headers.get(key)
+
+        print("{0} headers, {1} lookups per request".format(count, len(LOOKUPS)))
+        for name, func in (("scan", scan), ("index", indexed), ("index+constants", indexed_constants)):
+            cost = timeit.timeit(func, number=NUMBER) / NUMBER * 1e6
+            print("  {0:<16} {1:>8.3f} us".format(name, cost))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+JSON后端基准测试：错误信息、单个对象详情、20条分页列表、1000条导出列表几种典型响应，
+对比各后端编码为bytes及解码的耗时，未安装的后端跳过
+
+    python benchmarks/json_backends.py
+"""
+import os
+import sys
+import uuid
+import timeit
+import datetime
+from decimal import Decimal
+from importlib import import_module
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rest_framework.core.translation import lazy_translate as _  # noqa: E402
+from rest_framework.core.jsonbackends import AUTO_BACKENDS  # noqa: E402
+
+TOTAL_TIME = 0.5
+BACKENDS = AUTO_BACKENDS[:-1] + ("rest_framework.core.jsonbackends.ujson", AUTO_BACKENDS[-1])
+
+
+def make_row(index):
+    return {
+        "id": index,
+        "uuid": uuid.UUID(int=index),
+        "name": "商品名称{0}".format(index),
+        "price": Decimal("{0}.99".format(index % 1000)),
+        "stock": index * 7 % 500,
+        "on_sale": bool(index % 2),
+        "tags": ["tag{0}".format(index % 5), "tag{0}".format(index % 7)],
+        "created_at": datetime.datetime(2018, 7, 1, 12, 0, 0) + datetime.timedelta(minutes=index),
+        "description": "https://example.com/items/{0} 描述文本".format(index) * 3,
+    }
+
+
+def make_payloads():
+    rows = [make_row(index) for index in range(1000)]
+    return (
+        ("error", {"code": "parse_error", "message": _("Malformed request")}),
+        ("detail", rows[0]),
+        ("page(20)", {"count": 1000, "num_pages": 50, "results": rows[:20]}),
+        ("export(1000)", rows),
+    )
+
+
+def measure(func):
+    number = 1
+    while True:
+        cost = timeit.timeit(func, number=number)
+        if cost >= TOTAL_TIME:
+            return cost / number * 1e6
+        number *= 2 if cost > TOTAL_TIME / 10 else 10
+
+
+def main():
+    backends = []
+    for path in BACKENDS:
+        try:
+            backends.append(import_module(path).Handler())
+        except ImportError:
+            print("skip {0}: not installed".format(path.rsplit(".", 1)[-1]))
+
+    for name, payload in make_payloads():
+        print(name)
+        print("  {0:<10} {1:>12} {2:>12} {3:>10}".format("backend", "dumps(us)", "loads(us)", "bytes"))
+        for backend in backends:
+            body = backend.dumps(payload)
+            dumps = measure(lambda: backend.dumps(payload))
+            loads = measure(lambda: backend.loads(body))
+            print("  {0:<10} {1:>12.2f} {2:>12.2f} {3:>10}".format(backend.name, dumps, loads, len(body)))
+
+
+if __name__ == "__main__":
+    main()
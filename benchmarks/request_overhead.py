@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+handler执行前的单请求开销基准测试：构造Request、取路由路径、匹配路由、读取查询参数
+
+    python benchmarks/request_overhead.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rest_framework.core.datastructures import URL  # noqa: E402
+from rest_framework.core.request import Request  # noqa: E402
+from rest_framework.core.router import Router, Route  # noqa: E402
+
+NUMBER = 100000
+
+
+def handler(request, **kwargs):
+    pass
+
+
+def build_router():
+    router = Router()
+    for index in range(200):
+        pattern = "/api/v1/resource{0}/<int:id>".format(index).encode()
+        router.add_route(Route(pattern, handler, name="route{0}".format(index)))
+    return router
+
+
+def make_scope(query_string):
+    return {
+        "type": "http",
+        "scheme": "http",
+        "server": ("127.0.0.1", 8000),
+        "client": ("127.0.0.1", 50000),
+        "root_path": "",
+        "path": "/api/v1/resource150/42",
+        "raw_path": b"/api/v1/resource150/42",
+        "query_string": query_string,
+        "method": "GET",
+        "headers": [(b"host", b"127.0.0.1:8000")],
+    }
+
+
+def main():
+    router = build_router()
+    for query_string in (b"", b"page=2&page_size=20&search=abc"):
+        scope = make_scope(query_string)
+
+        def url_path():
+            request = Request(scope)
+            router._find_route(URL(scope=scope).path, request.method)
+            dict(request.query_params)
+
+        def scope_path():
+            request = Request(scope)
+            router.get_route(request)
+            dict(request.query_params)
+
+        print("query_string: {0!r}".format(query_string))
+        for name, func in (("URL(scope).path", url_path), ("Request.path", scope_path)):
+            cost = timeit.timeit(func, number=NUMBER) / NUMBER * 1e6
+            print("  {0:<16} {1:>8.3f} us".format(name, cost))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+响应压缩基准测试：约200KB、800KB的JSON列表响应在不同gzip/deflate压缩级别下的发送字节数与CPU耗时
+
+    python benchmarks/response_compression.py
+"""
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rest_framework.core.compression import COMPRESSORS  # noqa: E402
+from rest_framework.utils.escape import json_encode  # noqa: E402
+
+LEVELS = (1, 3, 6, 9)
+REPEAT = 20
+
+
+def make_payload(target_size):
+    random.seed(0)
+    rows = []
+    size = 0
+    while size < target_size:
+        row = {
+            "id": len(rows) + 1,
+            "name": "user_{0}".format(random.randint(1, 100000)),
+            "email": "user{0}@example.com".format(random.randint(1, 100000)),
+            "status": random.choice(("active", "disabled", "pending")),
+            "score": round(random.random() * 100, 2),
+            "created_at": "2018-07-{0:02d} 12:{1:02d}:00".format(random.randint(1, 28), random.randint(0, 59)),
+        }
+        rows.append(row)
+        size += len(json_encode(row)) + 1
+    return json_encode(rows).encode("utf-8")
+
+
+def main():
+    for target_size in (200 * 1024, 800 * 1024):
+        body = make_payload(target_size)
+        print("payload: {0} bytes".format(len(body)))
+        print("  {0:<8} {1:>5} {2:>12} {3:>8} {4:>10}".format("encoding", "level", "bytes", "ratio", "cpu(ms)"))
+        for name, handler in COMPRESSORS:
+            for level in LEVELS:
+                start = time.process_time()
+                for _ in range(REPEAT):
+                    compressor = handler.compressobj(level)
+                    compressed = compressor.compress(body) + compressor.flush()
+                cost = (time.process_time() - start) / REPEAT * 1000
+                print("  {0:<8} {1:>5} {2:>12} {3:>8.3f} {4:>10.2f}".format(
+                    name, level, len(compressed), len(compressed) / len(body), cost))
+
+
+if __name__ == "__main__":
+    main()
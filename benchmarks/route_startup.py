@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+应用启动加载路由耗时基准测试，对比重新编译urlconf与加载路由表快照
+
+    python benchmarks/route_startup.py [路由个数]
+"""
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+HANDLERS_TPL = '''
+from rest_framework.core.views import RequestHandler
+
+
+class ItemHandler(RequestHandler):
+    async def get(self, *args, **kwargs):
+        pass
+
+    async def put(self, *args, **kwargs):
+        pass
+'''
+
+URLS_TPL = '''
+from rest_framework.core.urls import url
+
+urlpatterns = [
+{0}
+]
+'''
+
+SETTINGS_TPL = '''
+ROOT_URLCONF = "bench_urls"
+ROUTE_SNAPSHOT = {0!r}
+'''
+
+
+def create_project(directory, count):
+    lines = []
+    for index in range(count):
+        if index % 2:
+            pattern = "/api/v1/resource{0}/<int:id>/items/<slug:item>".format(index)
+        else:
+            pattern = "/api/v1/resource{0}/list".format(index)
+        lines.append('    url("{0}", "bench_handlers.ItemHandler", name="r{1}"),'.format(pattern, index))
+
+    files = {
+        "bench_handlers.py": HANDLERS_TPL,
+        "bench_urls.py": URLS_TPL.format("\n".join(lines)),
+        "bench_settings.py": SETTINGS_TPL.format(os.path.join(directory, "routes.snapshot")),
+    }
+    for name, content in files.items():
+        with open(os.path.join(directory, name), "w") as f:
+            f.write(content)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    directory = tempfile.mkdtemp()
+    create_project(directory, count)
+    sys.path.insert(0, directory)
+    os.environ["TORNADO_REST_SETTINGS_MODULE"] = "bench_settings"
+
+    from rest_framework.conf import settings
+    from rest_framework.core import snapshot
+    from rest_framework.core.application import Application
+
+    start = time.perf_counter()
+    app = Application(use_route_snapshot=False)
+    compile_time = time.perf_counter() - start
+
+    snapshot.dump_routes(app.router, settings.ROUTE_SNAPSHOT, settings.ROOT_URLCONF)
+
+    start = time.perf_counter()
+    app = Application()
+    snapshot_time = time.perf_counter() - start
+
+    print("routes: {0} (router entries: {1})".format(count, len(app.router.route_list)))
+    print("compile urlconf: {0:.1f} ms".format(compile_time * 1000))
+    print("load snapshot:   {0:.1f} ms".format(snapshot_time * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+动态路由查找耗时基准测试，验证路由数量从10增长到5000时查找耗时基本不变
+
+    python benchmarks/router_lookup.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rest_framework.core.router import Router, Route  # noqa: E402
+from rest_framework.core.exceptions import NotFound  # noqa: E402
+
+ROUTE_COUNTS = (10, 100, 1000, 5000)
+NUMBER = 20000
+
+
+def handler(request, **kwargs):
+    pass
+
+
+def build_router(count):
+    router = Router()
+    for index in range(count):
+        pattern = "/api/v1/resource{0}/<id>/items/<item_id>".format(index).encode()
+        router.add_route(Route(pattern, handler, name="route{0}".format(index)))
+    return router
+
+
+def lookup(router, url):
+    # 每次清空缓存，测的是未命中缓存时的真实匹配耗时
+    router.clear_cache()
+    try:
+        router._find_route(url, b"GET")
+    except NotFound:
+        pass
+
+
+def main():
+    print("{0:>8} {1:>14} {2:>14}".format("routes", "last(us)", "miss(us)"))
+    for count in ROUTE_COUNTS:
+        router = build_router(count)
+        last_url = "/api/v1/resource{0}/42/items/7".format(count - 1).encode()
+        miss_url = b"/api/v1/unknown/42/items/7"
+        last = timeit.timeit(lambda: lookup(router, last_url), number=NUMBER)
+        miss = timeit.timeit(lambda: lookup(router, miss_url), number=NUMBER)
+        print("{0:>8} {1:>14.3f} {2:>14.3f}".format(
+            count, last / NUMBER * 1e6, miss / NUMBER * 1e6))
+
+
+if __name__ == "__main__":
+    main()
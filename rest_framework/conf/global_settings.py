@@ -22,6 +22,77 @@ CACHES = {
         }
     }
 }
+# 动态路由匹配结果的LRU缓存个数，0表示不缓存；可根据`router.cache_stats()`的命中数据调整
+ROUTE_CACHE_SIZE = 10240
+# 404路径的缓存个数，避免扫描随机url时冲刷路由缓存，0表示不缓存
+ROUTE_NOT_FOUND_CACHE_SIZE = 1024
+# 路由表快照文件路径，由`tornado-admin routes snapshot`生成，启动时优先加载；None表示不使用
+ROUTE_SNAPSHOT = None
+
+# 请求体最大字节数，超过时返回413，None表示不限制
+MAX_BODY_SIZE = 10 * 1024 * 1024
+# `request.body_file()`及上传文件超过该字节数时写入临时文件，而不是全部放在内存
+BODY_SPOOL_THRESHOLD = 1024 * 1024
+# multipart/form-data请求体最大字节数，上传文件边读边写入临时文件，因此不受MAX_BODY_SIZE限制
+MULTIPART_MAX_SIZE = 1024 * 1024 * 1024
+# 单个上传文件最大字节数
+MULTIPART_MAX_FILE_SIZE = 512 * 1024 * 1024
+# 单个请求最多的表单项个数
+MULTIPART_MAX_PARTS = 1000
+# 单个普通表单字段最大字节数（multipart及x-www-form-urlencoded），普通字段放在内存中
+FORM_MAX_FIELD_SIZE = 1024 * 1024
+# JSON编解码后端模块，None时依次选择已安装的orjson、rapidjson、标准库json，
+# 可选值见`rest_framework.core.jsonbackends`，也可以是自定义的提供`Handler`的模块
+JSON_BACKEND = None
+
+# FileResponse每次从磁盘读取并发送的字节数
+FILE_RESPONSE_CHUNK_SIZE = 64 * 1024
+
+# 是否按请求头Accept-Encoding压缩响应（gzip/deflate），handler可通过`compress_response`属性单独开启或关闭
+RESPONSE_COMPRESSION = False
+# 响应体小于该字节数时不压缩（流式响应不受限制）
+RESPONSE_COMPRESSION_MIN_SIZE = 1024
+# 压缩级别1-9，级别越高压缩率越高、CPU耗时越多
+RESPONSE_COMPRESSION_LEVEL = 6
+
+# 启动时预先建立数据库连接池、缓存连接的超时秒数
+LIFESPAN_STARTUP_TIMEOUT = 5
+# 关闭时等待处理中的请求及后台任务完成的最长秒数
+LIFESPAN_DRAIN_TIMEOUT = 5
+# 关闭数据库连接池等资源的超时秒数；三项均需小于服务器的lifespan超时（uvicorn为10秒）
+LIFESPAN_SHUTDOWN_TIMEOUT = 3
+
+# 每个worker同时执行的后台任务（Response.background）数上限
+BACKGROUND_TASKS_MAX_CONCURRENCY = 100
+# 达到上限后等待执行的后台任务数上限，超出时丢弃并记录日志
+BACKGROUND_TASKS_QUEUE_SIZE = 1000
+
+# 准入控制：同时处理的http请求数上限，None表示不限制
+ADMISSION_MAX_IN_FLIGHT = None
+# 按路由名称限制同时处理的请求数，如{"UserListHandler": 20}
+ADMISSION_ROUTE_LIMITS = {}
+# 达到上限后允许排队等待的请求数，队列已满时直接返回503
+ADMISSION_QUEUE_SIZE = 100
+# 排队等待的最长秒数，超时返回503
+ADMISSION_QUEUE_TIMEOUT = 1
+# 503响应中Retry-After的秒数
+ADMISSION_RETRY_AFTER = 1
+# 自适应模式：按请求延迟以AIMD方式调整全局并发上限，ADMISSION_MAX_IN_FLIGHT为初始值（未设置时为ADMISSION_MAX_LIMIT）
+ADMISSION_ADAPTIVE = False
+# 自适应模式的目标平均延迟（秒），超过时降低上限
+ADMISSION_TARGET_LATENCY = 0.2
+# 自适应模式并发上限的取值范围
+ADMISSION_MIN_LIMIT = 4
+ADMISSION_MAX_LIMIT = 1000
+
+# 请求处理超时秒数，超时后取消handler并返回504，SELECT查询同时带上MAX_EXECUTION_TIME；
+# None表示不限制，handler可用`request_timeout`属性覆盖
+REQUEST_TIMEOUT = None
+# 允许客户端通过该请求头（单位秒）缩短超时时间，如"X-Request-Timeout"，None表示不读取
+REQUEST_TIMEOUT_HEADER = None
+# 客户端断开连接时是否取消正在执行的handler（只对没有请求体或请求体已读取完的请求生效）
+CANCEL_ON_DISCONNECT = False
+
 # 语言
 LANGUAGE_CODE = 'en_US'
 LANGUAGE_DOMAIN = "messages"
@@ -76,3 +147,12 @@ DATETIME_INPUT_FORMATS = [
 ]
 
 LOGGING = {}
+# 日志通过队列交给后台线程批量写入，避免写文件、滚动日志文件阻塞事件循环
+LOGGING_QUEUE = True
+# 日志队列长度，队列已满时丢弃新的日志并计数
+LOGGING_QUEUE_SIZE = 10000
+# 后台线程每批最多写入的日志条数，每批每个handler只flush一次
+LOGGING_BATCH_SIZE = 100
+# 相同异常（类型、抛出位置和记录位置均相同）日志的去重窗口秒数，窗口内只输出一次并统计被抑制的条数；
+# None表示不去重
+LOGGING_DEDUP_WINDOW = 60
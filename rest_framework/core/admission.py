@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+"""
+请求准入控制（过载保护）
+限制同时处理的请求数，超出时进入有界等待队列，队列已满或等待超时立即返回503，
+避免过载时所有请求都堆积在事件循环、数据库连接池和缓存客户端里一起超时；
+自适应模式按观测到的请求延迟以AIMD方式调整全局并发上限
+"""
+import time
+import asyncio
+import collections
+
+from rest_framework.conf import settings
+from rest_framework.core.response import Response
+from rest_framework.utils import status
+
+RETRY_AFTER = "Retry-After"
+
+
+class ConcurrencyLimiter:
+    """
+    并发上限+有界等待队列
+    """
+
+    def __init__(self, limit, max_queue=0, queue_timeout=None, name="global"):
+        """
+        :param limit: 同时处理的请求数上限
+        :param max_queue: 达到上限后允许排队的请求数
+        :param queue_timeout: 排队等待的最长秒数，None表示一直等待
+        :param name:
+        """
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.waiters = collections.deque()
+
+        self.accepted = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.max_queue_depth = 0
+
+    async def acquire(self):
+        """
+        获取执行名额
+        :return: 是否获得名额，False时应直接拒绝请求
+        """
+        if self.in_flight < self.limit and not self.waiters:
+            self.in_flight += 1
+            self.accepted += 1
+            return True
+
+        if len(self.waiters) >= self.max_queue:
+            self.on_saturated()
+            self.rejected += 1
+            return False
+
+        self.on_saturated()
+        waiter = asyncio.get_event_loop().create_future()
+        self.waiters.append(waiter)
+        self.max_queue_depth = max(self.max_queue_depth, len(self.waiters))
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            self.rejected += 1
+            return False
+        except asyncio.CancelledError:
+            # 名额已经移交过来但请求被取消了，归还名额
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if not waiter.done() or waiter.cancelled():
+                try:
+                    self.waiters.remove(waiter)
+                except ValueError:
+                    pass
+
+        self.accepted += 1
+        return True
+
+    def release(self, latency=None):
+        """
+        归还名额，有排队的请求时直接移交给队首
+        :param latency: 本次请求的处理耗时（秒）
+        """
+        if self.in_flight <= self.limit:
+            while self.waiters:
+                waiter = self.waiters.popleft()
+                if not waiter.done():
+                    waiter.set_result(None)
+                    return
+        self.in_flight -= 1
+
+    def wakeup(self):
+        """
+        上限调高后唤醒排队的请求
+        """
+        while self.waiters and self.in_flight < self.limit:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def on_saturated(self):
+        pass
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queue_depth": len(self.waiters),
+            "max_queue_depth": self.max_queue_depth,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+        }
+
+
+class AdaptiveLimiter(ConcurrencyLimiter):
+    """
+    AIMD自适应并发上限：每处理完一个窗口（约等于当前上限个请求），
+    平均延迟超过目标延迟时上限乘以backoff，否则在上限确实被用满的情况下+1
+    """
+
+    def __init__(self, limit, max_queue=0, queue_timeout=None, name="global", target_latency=0.2,
+                 min_limit=1, max_limit=1000, backoff=0.9):
+        super().__init__(limit, max_queue, queue_timeout, name)
+        self.target_latency = target_latency
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+
+        self._samples = 0
+        self._latency_sum = 0.0
+        self._saturated = False
+
+    def on_saturated(self):
+        self._saturated = True
+
+    def release(self, latency=None):
+        super().release(latency)
+        if latency is None:
+            return
+
+        self._samples += 1
+        self._latency_sum += latency
+        if self._samples < self.limit:
+            return
+
+        average = self._latency_sum / self._samples
+        if average > self.target_latency:
+            self.limit = max(self.min_limit, int(self.limit * self.backoff))
+        elif self._saturated:
+            self.limit = min(self.max_limit, self.limit + 1)
+            self.wakeup()
+
+        self._samples = 0
+        self._latency_sum = 0.0
+        self._saturated = False
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats["target_latency"] = self.target_latency
+        return stats
+
+
+class AdmissionController:
+    """
+    按settings创建全局及路由级的并发限制，在调用handler前做准入判断
+    """
+
+    def __init__(self, max_in_flight=None, route_limits=None, queue_size=0, queue_timeout=None,
+                 retry_after=1, adaptive=False, target_latency=0.2, min_limit=1, max_limit=1000):
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.retry_after = str(retry_after)
+        self.route_limits = route_limits or {}
+        self.route_limiters = {}
+
+        if adaptive:
+            self.limiter = AdaptiveLimiter(
+                max_in_flight or max_limit, queue_size, queue_timeout, target_latency=target_latency,
+                min_limit=min_limit, max_limit=max_limit
+            )
+        elif max_in_flight:
+            self.limiter = ConcurrencyLimiter(max_in_flight, queue_size, queue_timeout)
+        else:
+            self.limiter = None
+
+    @classmethod
+    def from_settings(cls):
+        """
+        未配置任何限制时返回None，process_http不做准入判断
+        """
+        if not (settings.ADMISSION_MAX_IN_FLIGHT or settings.ADMISSION_ROUTE_LIMITS
+                or settings.ADMISSION_ADAPTIVE):
+            return None
+
+        return cls(
+            max_in_flight=settings.ADMISSION_MAX_IN_FLIGHT,
+            route_limits=settings.ADMISSION_ROUTE_LIMITS,
+            queue_size=settings.ADMISSION_QUEUE_SIZE,
+            queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT,
+            retry_after=settings.ADMISSION_RETRY_AFTER,
+            adaptive=settings.ADMISSION_ADAPTIVE,
+            target_latency=settings.ADMISSION_TARGET_LATENCY,
+            min_limit=settings.ADMISSION_MIN_LIMIT,
+            max_limit=settings.ADMISSION_MAX_LIMIT,
+        )
+
+    def get_route_limiter(self, route):
+        # 按路由名称共享，补齐斜杠生成的路由副本与原路由使用同一个限制
+        name = route.name
+        try:
+            return self.route_limiters[name]
+        except KeyError:
+            pass
+
+        limit = self.route_limits.get(name)
+        limiter = None
+        if limit:
+            limiter = ConcurrencyLimiter(limit, self.queue_size, self.queue_timeout, name=name)
+        self.route_limiters[name] = limiter
+        return limiter
+
+    def reject(self):
+        content = {settings.NON_FIELD_ERRORS: {
+            "message": status.HTTP_503_SERVICE_UNAVAILABLE.description,
+            "code": status.HTTP_503_SERVICE_UNAVAILABLE.phrase
+        }}
+        return Response(content, status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                        headers={RETRY_AFTER: self.retry_after})
+
+    async def call_handler(self, match, request, receive, send):
+        """
+        先获取路由级名额再获取全局名额，任一不足时返回503；
+        响应（包括StreamingResponse的响应体）发送完成后才归还名额，延迟样本也包含发送的耗时
+        :param match: RouteMatch
+        :param request:
+        :param receive:
+        :param send:
+        :return: 已发送的Response
+        """
+        acquired = []
+        latency = None
+        try:
+            for limiter in (self.get_route_limiter(match.route), self.limiter):
+                if limiter is None:
+                    continue
+                if not await limiter.acquire():
+                    response = self.reject()
+                    await response(receive, send)
+                    return response
+                acquired.append(limiter)
+
+            start = time.monotonic()
+            try:
+                response = await match.call_handler(request)
+                await response(receive, send)
+                return response
+            finally:
+                latency = time.monotonic() - start
+        finally:
+            for limiter in acquired:
+                limiter.release(latency)
+
+    def stats(self) -> dict:
+        return {
+            "global": self.limiter.stats() if self.limiter is not None else None,
+            "routes": {
+                name: limiter.stats()
+                for name, limiter in self.route_limiters.items() if limiter is not None
+            },
+        }
@@ -1,8 +1,17 @@
+import asyncio
 import logging
-import uvicorn
+
+from uvicorn.config import Config
 
 from rest_framework.conf import settings
 from rest_framework.core import urls
+from rest_framework.core import snapshot
+from rest_framework.core import singnals
+from rest_framework.core.admission import AdmissionController
+from rest_framework.core.background import BackgroundTaskRunner
+from rest_framework.core.db import databases
+from rest_framework.core.cache import caches
+from rest_framework.core.prefork import SocketServer, create_socket
 from rest_framework.core.exceptions import NotFound
 from rest_framework.core.request import Request
 from rest_framework.core.websockets import WebSocket
@@ -17,8 +26,17 @@ logger = logging.getLogger(__name__)
 
 class Application:
 
-    def __init__(self):
-        self.router = Router()
+    def __init__(self, use_route_snapshot=True):
+        self.use_route_snapshot = use_route_snapshot
+        self.router = Router(
+            cache_size=settings.ROUTE_CACHE_SIZE,
+            not_found_cache_size=settings.ROUTE_NOT_FOUND_CACHE_SIZE
+        )
+        # 处理中的http请求数，关闭时等待其归零
+        self.in_flight = 0
+        self._drained = None
+        self.admission = None
+        self.background = None
         self.initialize()
 
     def _add_error_routes(self):
@@ -30,17 +48,25 @@ class Application:
             self.router.default_handlers[status_code] = route
 
     def _load_route(self):
+        snapshot_path = settings.ROUTE_SNAPSHOT
+        if self.use_route_snapshot and snapshot_path:
+            if snapshot.load_routes(self, snapshot_path, settings.ROOT_URLCONF):
+                return
+
         urlpatterns = urls.url_patterns(settings.ROOT_URLCONF)
         for url in urlpatterns:
             pattern = url.pattern.strip("^").strip("$")
             self.register_route(pattern, handler=url.handler, name=url.name, **url.kwargs)
 
     def initialize(self):
-        configure_logging(settings.LOGGING)
+        configure_logging(settings.LOGGING, settings.LOGGING_QUEUE, settings.LOGGING_QUEUE_SIZE,
+                          settings.LOGGING_BATCH_SIZE, settings.LOGGING_DEDUP_WINDOW)
         self._load_route()
         self._add_error_routes()
         babel.load_translations()
         self.router.check_integrity()
+        self.admission = AdmissionController.from_settings()
+        self.background = BackgroundTaskRunner.from_settings()
 
     def register_route(self, pattern, handler, name=None, **kwargs):
         route_name = handler.__name__ if name is None else name
@@ -57,27 +83,150 @@ class Application:
         self.router.add_route(route)
         return handler
 
+    async def open_connections(self):
+        """
+        预先建立所有数据库连接池（填充到MINSIZE）并初始化缓存连接，
+        单个连接失败只记录日志，请求到来时仍会按需重连
+        """
+        for alias in databases:
+            try:
+                await databases[alias].connect()
+            except Exception:
+                logger.error(f"database `{alias}` connect failed on startup", exc_info=True)
+
+        for alias in settings.CACHES:
+            try:
+                await caches[alias].warmup()
+            except Exception:
+                logger.error(f"cache `{alias}` connect failed on startup", exc_info=True)
+
+    async def drain(self, timeout):
+        """
+        等待处理中的请求完成
+        :param timeout: 最长等待秒数
+        :return: 是否全部完成
+        """
+        if not self.in_flight:
+            return True
+
+        self._drained = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._drained.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"{self.in_flight} requests still in flight after {timeout}s, closing anyway")
+            return False
+        return True
+
+    @staticmethod
+    async def wait_receivers(results, timeout):
+        """
+        等待信号中协程接收者执行完成，超时未完成的取消
+        :param results: Signal.send的返回值
+        :param timeout:
+        """
+        futures = [value for _, value in results if asyncio.isfuture(value)]
+        if not futures:
+            return
+
+        done, pending = await asyncio.wait(futures, timeout=timeout)
+        for future in pending:
+            future.cancel()
+            logger.warning(f"signal receiver {future!r} timed out after {timeout}s")
+        for future in done:
+            if not future.cancelled() and future.exception() is not None:
+                logger.error("signal receiver failed", exc_info=future.exception())
+
+    async def startup(self):
+        timeout = settings.LIFESPAN_STARTUP_TIMEOUT
+        try:
+            await asyncio.wait_for(self.open_connections(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"opening connections timed out after {timeout}s")
+        await self.wait_receivers(singnals.app_started.send(self), timeout)
+
+    async def shutdown(self):
+        loop = asyncio.get_event_loop()
+        drain_deadline = loop.time() + settings.LIFESPAN_DRAIN_TIMEOUT
+        await self.drain(settings.LIFESPAN_DRAIN_TIMEOUT)
+        # 后台任务可能还要使用数据库和缓存，在关闭连接之前等待完成
+        await self.background.drain(max(0, drain_deadline - loop.time()))
+        # 数据库连接池由app_closed的接收者close_db_connections关闭
+        await self.wait_receivers(singnals.app_closed.send(self), settings.LIFESPAN_SHUTDOWN_TIMEOUT)
+        for cache in caches.all():
+            try:
+                cache.close()
+            except Exception:
+                logger.error("cache close failed on shutdown", exc_info=True)
+
+    def process_lifespan(self, scope: Scope) -> ASGIInstance:
+        async def process_callable(receive: Receive, send: Send) -> None:
+            while True:
+                message = await receive()
+                # uvicorn 0.3不支持lifespan.*.failed消息，记录日志后重新抛出，由服务器报告并退出
+                if message["type"] == "lifespan.startup":
+                    try:
+                        await self.startup()
+                    except Exception:
+                        logger.error("application startup failed", exc_info=True)
+                        raise
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    try:
+                        await self.shutdown()
+                    except Exception:
+                        logger.error("application shutdown failed", exc_info=True)
+                        raise
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+
+        return process_callable
+
     def process_http(self, scope: Scope) -> ASGIInstance:
         async def process_callable(receive: Receive, send: Send) -> None:
             request = Request(scope, receive=receive)
-            route = self.router.get_route(request)
-            response = await route.call_handler(request)
-            await response(receive, send)
+            self.in_flight += 1
+            try:
+                match = self.router.get_route(request)
+                if self.admission is None:
+                    response = await match.call_handler(request)
+                    await response(receive, send)
+                else:
+                    response = await self.admission.call_handler(match, request, receive, send)
+                background = getattr(response, "background", None)
+                if background is not None:
+                    self.background.submit(background)
+            finally:
+                await request.close()
+                self.in_flight -= 1
+                if not self.in_flight and self._drained is not None:
+                    self._drained.set()
 
         return process_callable
 
+    def admission_stats(self) -> dict:
+        """
+        准入控制的统计：当前上限、处理中及排队的请求数、拒绝次数等
+        """
+        return self.admission.stats() if self.admission is not None else {}
+
+    def background_stats(self) -> dict:
+        """
+        后台任务的统计：执行中、排队、完成、失败及丢弃的任务数
+        """
+        return self.background.stats()
+
     def process_websocket(self, scope: Scope) -> ASGIInstance:
         async def process_callable(receive: Receive, send: Send) -> None:
             session = WebSocket(scope, receive=receive, send=send)
             try:
-                route = self.router.get_route(session)
+                match = self.router.get_route(session)
             except NotFound:
                 await send({"type": "websocket.close", "code": 1000})
             except Exception:
                 logger.error("websocket request process error", exc_info=True)
                 await send({"type": "websocket.close", "code": 1000})
             else:
-                await route.call_handler(session)
+                await match.call_handler(session)
 
         return process_callable
 
@@ -90,13 +239,26 @@ class ProtocolRouter:
         app = self.protocols[scope["type"]]
         return app(scope)
 
-    def run(self, host: str='127.0.0.1', port: int=5000):
-        uvicorn.run(self, host=host, port=port)
+    def run(self, host: str='127.0.0.1', port: int=5000, backlog: int=2048, **kwargs):
+        """
+        单进程运行
+        :param host:
+        :param port:
+        :param backlog: listen队列长度
+        :param kwargs: 传给uvicorn Config的参数，如loop、http、timeout_keep_alive、limit_concurrency、access_log
+        """
+        config = Config(self, **kwargs)
+        sock = create_socket(host, port, backlog)
+        SocketServer(config, sock).run()
 
 
 def get_application():
     app = Application()
-    protocol_router = ProtocolRouter({"http": app.process_http, "websocket": app.process_websocket})
+    protocol_router = ProtocolRouter({
+        "http": app.process_http,
+        "websocket": app.process_websocket,
+        "lifespan": app.process_lifespan,
+    })
 
     return protocol_router
 
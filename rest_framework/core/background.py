@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+后台任务
+handler把缓存预热、审计记录、webhook等后续处理附加到Response上，响应发送完成后才执行，不计入请求耗时；
+每个worker进程的后台任务由BackgroundTaskRunner统一记录、限制并发，关闭时等待其完成
+"""
+import asyncio
+import logging
+import functools
+import collections
+
+from rest_framework.conf import settings
+from rest_framework.core import deadline
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundTask:
+    """
+    单个后台任务，func为协程函数时直接await，否则在线程池中执行
+    """
+
+    def __init__(self, func, *args, **kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+
+    async def __call__(self):
+        if asyncio.iscoroutinefunction(self.func):
+            return await self.func(*self.args, **self.kwargs)
+
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, functools.partial(self.func, *self.args, **self.kwargs))
+
+    def __repr__(self):
+        return "<%s %s>" % (self.__class__.__name__, getattr(self.func, "__qualname__", self.func))
+
+
+class BackgroundTasks(BackgroundTask):
+    """
+    按添加顺序依次执行的一组后台任务，其中一个失败时不再执行后面的任务
+    """
+
+    def __init__(self, tasks=None):
+        self.tasks = list(tasks or [])
+
+    def add_task(self, func, *args, **kwargs):
+        self.tasks.append(BackgroundTask(func, *args, **kwargs))
+
+    async def __call__(self):
+        for task in self.tasks:
+            await task()
+
+    def __repr__(self):
+        return "<%s %r>" % (self.__class__.__name__, self.tasks)
+
+
+class BackgroundTaskRunner:
+    """
+    执行后台任务：同时执行的任务数达到上限时排队，队列已满时丢弃
+    """
+
+    def __init__(self, max_concurrency=100, max_pending=1000):
+        """
+        :param max_concurrency: 同时执行的任务数上限
+        :param max_pending: 等待执行的任务数上限
+        """
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self.running = set()
+        self.pending = collections.deque()
+        self._idle = None
+
+        self.completed = 0
+        self.failed = 0
+        self.dropped = 0
+
+    @classmethod
+    def from_settings(cls):
+        return cls(settings.BACKGROUND_TASKS_MAX_CONCURRENCY, settings.BACKGROUND_TASKS_QUEUE_SIZE)
+
+    def submit(self, task):
+        """
+        :param task: BackgroundTask或无参数的协程函数
+        :return: 是否已开始执行或进入队列
+        """
+        if len(self.running) < self.max_concurrency:
+            self._start(task)
+            return True
+
+        if len(self.pending) >= self.max_pending:
+            self.dropped += 1
+            logger.warning(f"background task queue is full, dropping {task!r}")
+            return False
+
+        self.pending.append(task)
+        return True
+
+    def _start(self, task):
+        future = asyncio.ensure_future(self._run(task))
+        self.running.add(future)
+        future.add_done_callback(self._done)
+
+    async def _run(self, task):
+        # 任务创建时继承了请求的截止时间，响应已发送完成，不再受其限制
+        deadline.set_deadline(None)
+        try:
+            await task()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.failed += 1
+            logger.error(f"background task {task!r} failed", exc_info=True)
+        else:
+            self.completed += 1
+
+    def _done(self, future):
+        self.running.discard(future)
+        while self.pending and len(self.running) < self.max_concurrency:
+            self._start(self.pending.popleft())
+        if not self.running and self._idle is not None:
+            self._idle.set()
+
+    async def drain(self, timeout):
+        """
+        等待执行中及排队的任务完成，超时后取消剩余任务
+        :param timeout: 最长等待秒数
+        :return: 是否全部完成
+        """
+        if not self.running and not self.pending:
+            return True
+
+        self._idle = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"{len(self.running)} background tasks running and {len(self.pending)} pending "
+                           f"after {timeout}s, cancelling")
+            self.pending.clear()
+            for future in list(self.running):
+                future.cancel()
+            return False
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "running": len(self.running),
+            "pending": len(self.pending),
+            "completed": self.completed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+        }
@@ -178,6 +178,13 @@ class BaseCache:
         """
         self.set(key, (self.get(key) or 0) - delta)
 
+    async def warmup(self):
+        """
+        建立连接，应用启动时调用，避免首个请求承担建连开销
+        :return:
+        """
+        pass
+
     def close(self, *args, **kwargs):
         """
         关闭连接
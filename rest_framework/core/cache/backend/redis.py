@@ -29,6 +29,13 @@ class CacheWrapper(BaseCache):
             self._client = aredis.StrictRedis.from_url(url=self._server, **self._options)
         return self._client
 
+    async def warmup(self):
+        await self.client.ping()
+
+    def close(self, *args, **kwargs):
+        if self._client is not None:
+            self._client.connection_pool.disconnect()
+
     async def delete(self, key):
         key = self.make_key(key)
         return await self.client.delete(key)
@@ -1,3 +1,92 @@
+import os
+import re
+import tempfile
+from urllib.parse import unquote_plus
+
+from rest_framework.conf import settings
+from rest_framework.core.datastructures import CONTENT_TYPE, UploadedFile
+from rest_framework.core.exceptions import ParseError, RequestEntityTooLarge
+
+try:
+    from rest_framework.core.serializers import msgpack as msgpack_serializer
+    msgpack_handler = msgpack_serializer.Handler()
+except ImportError:
+    msgpack_handler = None
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack")
+
+OPTION_HEADER_REGEX = re.compile(r';\s*([^=;\s]+)\s*=\s*("(?:[^"\\]|\\.)*"|[^;]*)')
+
+
+def parse_options_header(value):
+    """
+    解析带参数的头，如`form-data; name="file"; filename="a.txt"`
+    :param value:
+    :return: (主值, {参数名: 参数值})
+    """
+    main, _, rest = value.partition(";")
+    options = {}
+    for name, option in OPTION_HEADER_REGEX.findall(";" + rest):
+        option = option.strip()
+        if len(option) >= 2 and option[0] == option[-1] == '"':
+            option = option[1:-1].replace('\\\\', '\\').replace('\\"', '"')
+        options[name.lower()] = option
+    return main.strip().lower(), options
+
+
+def parse_accept(value):
+    """
+    :param value: Accept头，如`application/msgpack, application/json;q=0.5`
+    :return: {媒体类型: q值}
+    """
+    media_types = {}
+    for item in value.split(","):
+        media_type, _, params = item.partition(";")
+        media_type = media_type.strip().lower()
+        if not media_type:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, param_value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(param_value)
+                except ValueError:
+                    quality = 0.0
+        media_types[media_type] = quality
+    return media_types
+
+
+def negotiate_media_type(accept):
+    """
+    按Accept选择响应格式：客户端明确接受msgpack，且q值不低于json时返回msgpack，否则返回json
+    """
+    if msgpack_handler is None or not accept or "msgpack" not in accept:
+        return JSON_MEDIA_TYPE
+
+    media_types = parse_accept(accept)
+    msgpack_quality = max(media_types.get(media_type, 0.0) for media_type in MSGPACK_MEDIA_TYPES)
+    json_quality = media_types.get(
+        JSON_MEDIA_TYPE, media_types.get("application/*", media_types.get("*/*", 0.0))
+    )
+    if msgpack_quality > 0 and msgpack_quality >= json_quality:
+        return MSGPACK_MEDIA_TYPE
+    return JSON_MEDIA_TYPE
+
+
+def add_form_value(data, name, value):
+    """
+    同名的表单项转为列表
+    """
+    if name not in data:
+        data[name] = value
+    elif isinstance(data[name], list):
+        data[name].append(value)
+    else:
+        data[name] = [data[name], value]
+
 
 class BaseParser(object):
     media_type = None
@@ -14,4 +103,242 @@ class JSONParser(BaseParser):
         return data
 
 
-PARSER_MEDIA_TYPE = (JSONParser(),)
+class MessagePackParser(BaseParser):
+    media_type = MSGPACK_MEDIA_TYPE
+
+    async def parse(self, request):
+        body = await request.body()
+        if not body:
+            return {}
+        try:
+            return msgpack_handler.loads(body)
+        except Exception:
+            raise ParseError()
+
+
+class FormParser(BaseParser):
+    """
+    application/x-www-form-urlencoded，按块读取请求体，只缓存最后一个不完整的字段
+    """
+    media_type = 'application/x-www-form-urlencoded'
+
+    async def parse(self, request):
+        max_field_size = settings.FORM_MAX_FIELD_SIZE
+        data = {}
+        tail = b""
+        async for chunk in request.stream():
+            pairs = (tail + chunk).split(b"&")
+            tail = pairs.pop()
+            if max_field_size is not None and len(tail) > max_field_size:
+                raise RequestEntityTooLarge()
+
+            for pair in pairs:
+                if max_field_size is not None and len(pair) > max_field_size:
+                    raise RequestEntityTooLarge()
+                self.add_pair(data, pair)
+
+        self.add_pair(data, tail)
+        return data
+
+    @staticmethod
+    def add_pair(data, pair):
+        if not pair:
+            return
+        name, _, value = pair.partition(b"=")
+        name = unquote_plus(name.decode("latin-1"), errors="replace")
+        value = unquote_plus(value.decode("latin-1"), errors="replace")
+        add_form_value(data, name, value)
+
+
+class MultiPartReader(object):
+    """
+    multipart/form-data增量解析，`feed`逐块传入请求体，缓冲区只保留不足以判断边界的尾部数据；
+    文件写入SpooledTemporaryFile，超过`settings.BODY_SPOOL_THRESHOLD`后转存到磁盘，
+    因此内存占用与上传文件大小无关
+    """
+    PREAMBLE, DELIMITER, HEADERS, BODY, END = range(5)
+    max_header_size = 16 * 1024
+
+    def __init__(self, boundary: bytes):
+        self.delimiter = b"--" + boundary
+        self.body_delimiter = b"\r\n--" + boundary
+        self.state = self.PREAMBLE
+        self.buffer = bytearray()
+        self.data = {}
+        self.files = {}
+        self.part_count = 0
+
+        self.max_file_size = settings.MULTIPART_MAX_FILE_SIZE
+        self.max_field_size = settings.FORM_MAX_FIELD_SIZE
+        self.max_parts = settings.MULTIPART_MAX_PARTS
+        self.spool_size = settings.BODY_SPOOL_THRESHOLD or 0
+
+        # 当前正在读取的part
+        self.name = None
+        self.filename = None
+        self.content_type = None
+        self.charset = None
+        self.sink = None
+        self.size = 0
+
+    def feed(self, chunk: bytes):
+        buffer = self.buffer
+        buffer += chunk
+        while 1:
+            state = self.state
+            if state == self.BODY:
+                index = buffer.find(self.body_delimiter)
+                if index < 0:
+                    # 末尾可能是边界的前半部分，需要保留
+                    safe = len(buffer) - len(self.body_delimiter) + 1
+                    if safe > 0:
+                        self.write(buffer[:safe])
+                        del buffer[:safe]
+                    return
+                self.write(buffer[:index])
+                del buffer[:index + len(self.body_delimiter)]
+                self.end_part()
+                self.state = self.DELIMITER
+
+            elif state == self.DELIMITER:
+                if len(buffer) < 2:
+                    return
+                if buffer[:2] == b"--":
+                    self.state = self.END
+                elif buffer[:2] == b"\r\n":
+                    del buffer[:2]
+                    self.state = self.HEADERS
+                else:
+                    raise ParseError()
+
+            elif state == self.HEADERS:
+                index = buffer.find(b"\r\n\r\n")
+                if index < 0:
+                    if len(buffer) > self.max_header_size:
+                        raise ParseError()
+                    return
+                self.start_part(bytes(buffer[:index]))
+                del buffer[:index + 4]
+                self.state = self.BODY
+
+            elif state == self.PREAMBLE:
+                index = buffer.find(self.delimiter)
+                if index < 0:
+                    del buffer[:max(0, len(buffer) - len(self.delimiter))]
+                    return
+                del buffer[:index + len(self.delimiter)]
+                self.state = self.DELIMITER
+
+            else:
+                # 结束边界之后的内容忽略
+                buffer.clear()
+                return
+
+    def start_part(self, raw_headers: bytes):
+        self.part_count += 1
+        if self.max_parts is not None and self.part_count > self.max_parts:
+            raise RequestEntityTooLarge()
+
+        headers = {}
+        for line in raw_headers.split(b"\r\n"):
+            key, sep, value = line.partition(b":")
+            if not sep:
+                raise ParseError()
+            headers[key.strip().lower()] = value.strip().decode("utf-8", "replace")
+
+        disposition, options = parse_options_header(headers.get(b"content-disposition", ""))
+        if disposition != "form-data" or "name" not in options:
+            raise ParseError()
+
+        content_type, type_options = parse_options_header(headers.get(b"content-type", ""))
+        self.name = options["name"]
+        self.filename = options.get("filename")
+        self.content_type = content_type or None
+        self.charset = type_options.get("charset", "utf-8")
+        self.size = 0
+        if self.filename is None:
+            self.sink = bytearray()
+        else:
+            # 去掉部分浏览器带上的客户端路径
+            self.filename = os.path.basename(self.filename.replace("\\", "/"))
+            self.sink = tempfile.SpooledTemporaryFile(max_size=self.spool_size)
+
+    def write(self, data):
+        if not data:
+            return
+        self.size += len(data)
+        if self.filename is None:
+            if self.max_field_size is not None and self.size > self.max_field_size:
+                raise RequestEntityTooLarge()
+            self.sink += data
+        else:
+            if self.max_file_size is not None and self.size > self.max_file_size:
+                raise RequestEntityTooLarge()
+            self.sink.write(data)
+
+    def end_part(self):
+        if self.filename is None:
+            try:
+                value = self.sink.decode(self.charset, "replace")
+            except LookupError:
+                value = self.sink.decode("utf-8", "replace")
+            add_form_value(self.data, self.name, value)
+        else:
+            self.sink.seek(0)
+            upload_file = UploadedFile(self.sink, self.filename, self.content_type, self.size)
+            add_form_value(self.files, self.name, upload_file)
+        self.sink = None
+
+    def finish(self):
+        if self.state != self.END:
+            raise ParseError()
+        return self.data, self.files
+
+    def close(self):
+        """
+        解析失败时关闭已经创建的临时文件
+        """
+        if self.sink is not None and self.filename is not None:
+            self.sink.close()
+        for upload_file in self.iter_files(self.files):
+            upload_file.close()
+
+    @staticmethod
+    def iter_files(files):
+        for value in files.values():
+            if isinstance(value, list):
+                yield from value
+            else:
+                yield value
+
+
+class MultiPartParser(BaseParser):
+    """
+    multipart/form-data，普通字段放入`request.data`，
+    上传文件（UploadedFile）同时放入`request.data`与`request.files`，请求结束时关闭
+    """
+    media_type = 'multipart/form-data'
+
+    async def parse(self, request):
+        _, options = parse_options_header(request.headers.get(CONTENT_TYPE, ""))
+        boundary = options.get("boundary")
+        if not boundary or len(boundary) > 200:
+            raise ParseError()
+
+        reader = MultiPartReader(boundary.encode("latin-1"))
+        try:
+            async for chunk in request.stream(max_size=settings.MULTIPART_MAX_SIZE):
+                reader.feed(chunk)
+            data, files = reader.finish()
+        except BaseException:
+            reader.close()
+            raise
+
+        request.files.update(files)
+        data.update(files)
+        return data
+
+
+PARSER_MEDIA_TYPE = (JSONParser(), FormParser(), MultiPartParser())
+if msgpack_handler is not None:
+    PARSER_MEDIA_TYPE += (MessagePackParser(),)
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+响应压缩
+根据请求头Accept-Encoding选择gzip或deflate压缩响应体，并设置Content-Encoding、Vary，强ETag加上编码后缀；
+StreamingResponse使用增量压缩对象逐块压缩
+"""
+import zlib
+
+from rest_framework.conf import settings
+from rest_framework.core.compressors import gzip as gzip_compressor
+from rest_framework.core.compressors import zlib as zlib_compressor
+from rest_framework.core.conditional import encode_etag
+from rest_framework.core.datastructures import (
+    ACCEPT_ENCODING, CONTENT_ENCODING, CONTENT_LENGTH, CONTENT_TYPE, ETAG, add_vary
+)
+from rest_framework.core.response import StreamingResponse, FileResponse
+
+# 按优先级排列，q值相同时取靠前的
+COMPRESSORS = (
+    ("gzip", gzip_compressor.Handler()),
+    ("deflate", zlib_compressor.Handler()),
+)
+COMPRESSIBLE_TYPES = (
+    "text/", "application/json", "application/x-ndjson", "application/javascript",
+    "application/xml", "application/msgpack", "application/x-msgpack",
+)
+
+
+def parse_accept_encoding(value):
+    """
+    :param value: 如`gzip;q=1.0, deflate;q=0.5, *;q=0`
+    :return: {编码: q值}
+    """
+    encodings = {}
+    for item in value.split(","):
+        encoding, _, params = item.partition(";")
+        encoding = encoding.strip().lower()
+        if not encoding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        encodings[encoding] = quality
+    return encodings
+
+
+def select_encoding(accept_encoding):
+    """
+    :param accept_encoding:
+    :return: (编码名称, 压缩处理对象)，客户端不接受压缩时返回(None, None)
+    """
+    if not accept_encoding:
+        return None, None
+
+    encodings = parse_accept_encoding(accept_encoding)
+    default = encodings.get("*", 0.0)
+    selected, selected_quality = (None, None), 0.0
+    for name, compressor in COMPRESSORS:
+        quality = encodings.get(name, default)
+        if quality > selected_quality:
+            selected, selected_quality = (name, compressor), quality
+    return selected
+
+
+def is_compressible(response):
+    if isinstance(response, FileResponse):
+        # 文件按原样发送，以支持Range请求及zerocopysend
+        return False
+    if not 200 <= response.status_code < 300 or response.status_code == 204:
+        return False
+
+    headers = response.headers
+    if CONTENT_ENCODING in headers:
+        return False
+
+    content_type = headers.get(CONTENT_TYPE, "")
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+async def compress_stream(iterator, compressor, charset):
+    # 每块都做Z_SYNC_FLUSH，客户端能及时收到已经生成的数据
+    try:
+        async for chunk in iterator:
+            if not isinstance(chunk, bytes):
+                chunk = chunk.encode(charset)
+            data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        # 本生成器被关闭时一并关闭内层迭代器，释放其占用的游标和连接
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+def compress_response(request, response, min_size=None, level=None):
+    """
+    按请求头Accept-Encoding压缩响应，原地修改并返回response
+    :param request:
+    :param response: Response或StreamingResponse
+    :param min_size: 响应体小于该字节数时不压缩，默认为`settings.RESPONSE_COMPRESSION_MIN_SIZE`
+    :param level: 压缩级别，默认为`settings.RESPONSE_COMPRESSION_LEVEL`
+    :return:
+    """
+    if not is_compressible(response):
+        return response
+
+    headers = response.headers
+    add_vary(headers, "Accept-Encoding")
+    encoding, handler = select_encoding(request.headers.get(ACCEPT_ENCODING))
+    if encoding is None:
+        return response
+
+    if level is None:
+        level = settings.RESPONSE_COMPRESSION_LEVEL
+
+    if isinstance(response, StreamingResponse):
+        compressor = handler.compressobj(level)
+        response.body_iterator = compress_stream(response.body_iterator, compressor, response.charset)
+    else:
+        if min_size is None:
+            min_size = settings.RESPONSE_COMPRESSION_MIN_SIZE
+        if len(response.body) < min_size:
+            return response
+
+        compressor = handler.compressobj(level)
+        body = compressor.compress(response.body) + compressor.flush()
+        if len(body) >= len(response.body):
+            return response
+        response.body = body
+        headers[CONTENT_LENGTH] = str(len(body))
+
+    headers[CONTENT_ENCODING] = encoding
+    etag = headers.get(ETAG)
+    if etag is not None:
+        headers[ETAG] = encode_etag(etag, encoding)
+    return response
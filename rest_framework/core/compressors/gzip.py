@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+import zlib
+
+from rest_framework.core.exceptions import CompressorError
+
+# zlib的wbits加16输出gzip格式
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+class Handler:
+    min_length = 15
+    preset = 6
+
+    def compress(self, value):
+        if len(value) > self.min_length:
+            compressor = self.compressobj()
+            return compressor.compress(value) + compressor.flush()
+        return value
+
+    def compressobj(self, level=None):
+        """
+        增量压缩对象，用于流式响应
+        """
+        return zlib.compressobj(self.preset if level is None else level, zlib.DEFLATED, GZIP_WBITS)
+
+    def decompress(self, value):
+        try:
+            return zlib.decompress(value, GZIP_WBITS)
+        except zlib.error as e:
+            raise CompressorError(e)
@@ -13,6 +13,12 @@ class Handler:
             return zlib.compress(value, self.preset)
         return value
 
+    def compressobj(self, level=None):
+        """
+        增量压缩对象，用于流式响应
+        """
+        return zlib.compressobj(self.preset if level is None else level)
+
     def decompress(self, value):
         try:
             return zlib.decompress(value)
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+条件请求
+ETag/Last-Modified的生成与If-None-Match、If-Modified-Since、If-Match的判断
+"""
+import re
+import hashlib
+from datetime import datetime
+
+import pytz
+
+from rest_framework.core.datastructures import (
+    ETAG, IF_MATCH, IF_MODIFIED_SINCE, IF_NONE_MATCH, LAST_MODIFIED, CONTENT_LENGTH, VARY
+)
+from rest_framework.core.response import Response
+from rest_framework.utils import status
+from rest_framework.utils.timezone import http_date, parse_http_date
+
+
+def generate_etag(*parts):
+    """
+    生成强校验ETag
+    :param parts: bytes或可转为str的值
+    :return: 带引号的ETag，如`"0cc175b9c0f1b6a831c399e269772661"`
+    """
+    md5 = hashlib.md5()
+    for part in parts:
+        md5.update(part if isinstance(part, bytes) else str(part).encode("utf-8"))
+        md5.update(b"\0")
+    return '"%s"' % md5.hexdigest()
+
+
+# 压缩后响应的强ETag加上编码后缀，如`"0cc1...-gzip"`，不同的响应体不共用同一个强校验值
+ENCODING_SUFFIX = re.compile(r'-(?:gzip|deflate)"$')
+
+
+def encode_etag(etag, encoding):
+    """
+    :param etag: 未压缩响应的ETag
+    :param encoding: Content-Encoding
+    :return: 压缩后响应的ETag，弱ETag原样返回
+    """
+    if etag.startswith("W/") or not etag.endswith('"') or ENCODING_SUFFIX.search(etag):
+        return etag
+    return '%s-%s"' % (etag[:-1], encoding)
+
+
+def strip_etag_encoding(etag):
+    """
+    去掉压缩时加上的编码后缀，与未压缩响应的ETag比较
+    """
+    return ENCODING_SUFFIX.sub('"', etag)
+
+
+def parse_etags(value):
+    """
+    :param value: If-None-Match/If-Match头，如`"a", W/"b"`
+    :return: ETag列表，`*`原样返回
+    """
+    return [etag.strip() for etag in value.split(",") if etag.strip()]
+
+
+def etag_matches(etag, value, weak=True):
+    """
+    :param etag: 当前资源的ETag
+    :param value: If-None-Match/If-Match头
+    :param weak: True为弱比较（If-None-Match），False为强比较（If-Match），强比较时弱ETag都不匹配
+    :return:
+    """
+    for candidate in parse_etags(value):
+        if candidate == "*":
+            return True
+        candidate = strip_etag_encoding(candidate)
+        if weak:
+            if candidate.replace("W/", "", 1) == etag.replace("W/", "", 1):
+                return True
+        elif candidate == etag and not etag.startswith("W/"):
+            return True
+    return False
+
+
+def is_not_modified(request, etag=None, last_modified: datetime = None):
+    """
+    GET/HEAD请求是否可以返回304，有If-None-Match时忽略If-Modified-Since
+    """
+    if request.method not in (b"GET", b"HEAD"):
+        return False
+
+    headers = request.headers
+    if_none_match = headers.get(IF_NONE_MATCH)
+    if if_none_match:
+        return etag is not None and etag_matches(etag, if_none_match)
+
+    if_modified_since = headers.get(IF_MODIFIED_SINCE)
+    if if_modified_since and last_modified is not None:
+        since = parse_http_date(if_modified_since)
+        if last_modified.tzinfo is None:
+            last_modified = pytz.utc.localize(last_modified)
+        return since is not None and last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def set_validators(response, etag=None, last_modified=None):
+    headers = response.headers
+    if etag is not None:
+        headers[ETAG] = etag
+    if last_modified is not None:
+        headers[LAST_MODIFIED] = http_date(last_modified)
+    return response
+
+
+def not_modified_response(etag=None, last_modified=None, vary=None):
+    """
+    不带响应体的304
+    :param vary: 对应的200响应的Vary，304须带上（RFC 7232 4.1），否则缓存无法区分各个变体
+    """
+    response = Response(b"", status_code=status.HTTP_304_NOT_MODIFIED, content_type=None)
+    headers = response.headers
+    del headers[CONTENT_LENGTH]
+    if vary:
+        headers[VARY] = vary
+    return set_validators(response, etag, last_modified)
+
+
+def is_precondition_failed(request, etag):
+    """
+    If-Match不匹配当前资源时返回True，没有If-Match头时返回False
+    """
+    if_match = request.headers.get(IF_MATCH)
+    if not if_match:
+        return False
+    return etag is None or not etag_matches(etag, if_match, weak=False)
@@ -3,6 +3,19 @@ from rest_framework.core.types import Scope, StrDict, BytesPairs, StrPairs
 from urllib.parse import parse_qsl, unquote, urlparse, ParseResult
 
 
+def get_route_path(scope: Scope) -> bytes:
+    """
+    直接从scope取出用于路由匹配的路径，不拼接、不解析完整url；
+    没有百分号编码时`raw_path`与`path`一致，可以省掉一次编码
+    """
+    root_path = scope.get("root_path", "")
+    raw_path = scope.get("raw_path")
+    if raw_path is not None and not root_path and b"%" not in raw_path:
+        return raw_path
+
+    return (root_path + scope["path"]).encode()
+
+
 class URL:
     def __init__(self, url: str = "", scope: Scope = None):
         if scope is not None:
@@ -90,19 +103,39 @@ class URL:
 
 
 class QueryParams(StrDict):
+    """
+    查询参数，第一次访问时才解析，字典索引在第一次按key取值时才建立
+    """
+    __slots__ = ("_value", "_items", "_mapping")
+
     def __init__(self, value: typing.Union[str, typing.Union[StrDict, StrPairs]] = None) -> None:
-        if value is None:
-            value = []
-        elif isinstance(value, str):
-            value = parse_qsl(value)
+        self._value = value
+        self._items = None
+        self._mapping = None
 
-        if hasattr(value, "items"):
-            items = list(typing.cast(StrDict, value).items())
-        else:
-            items = list(typing.cast(StrPairs, value))
+    @property
+    def _list(self) -> StrPairs:
+        if self._items is None:
+            value = self._value
+            if not value:
+                items = []
+            elif isinstance(value, str):
+                items = parse_qsl(value)
+            elif hasattr(value, "items"):
+                items = list(typing.cast(StrDict, value).items())
+            else:
+                items = list(typing.cast(StrPairs, value))
+            self._items = items
+            self._value = None
+
+        return self._items
 
-        self._dict = {k: v for k, v in reversed(items)}
-        self._list = items
+    @property
+    def _dict(self) -> dict:
+        if self._mapping is None:
+            self._mapping = {k: v for k, v in reversed(self._list)}
+
+        return self._mapping
 
     def getlist(self, key: typing.Any) -> typing.List[str]:
         return [v for k, v in self._list if k == key]
@@ -141,9 +174,126 @@ class QueryParams(StrDict):
         return f"QueryParams({repr(self._list)})"
 
 
+class UploadedFile:
+    """
+    上传的文件，内容保存在文件对象（一般是SpooledTemporaryFile）中
+    """
+    __slots__ = ("file", "name", "content_type", "size")
+
+    def __init__(self, file: typing.BinaryIO, name: str, content_type: str = None,
+                 size: int = 0) -> None:
+        self.file = file
+        self.name = name
+        self.content_type = content_type
+        self.size = size
+
+    def read(self, size: int = -1) -> bytes:
+        return self.file.read(size)
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        return self.file.seek(offset, whence)
+
+    def chunks(self, chunk_size: int = 64 * 1024) -> typing.Iterator[bytes]:
+        self.file.seek(0)
+        while 1:
+            chunk = self.file.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.name!r}, {self.content_type!r}, size={self.size})"
+
+
+# 常用请求/响应头的名称，按ASGI的约定为小写bytes，可以直接用于Headers查找
+HOST = b"host"
+ACCEPT = b"accept"
+ACCEPT_ENCODING = b"accept-encoding"
+ACCEPT_LANGUAGE = b"accept-language"
+AUTHORIZATION = b"authorization"
+CACHE_CONTROL = b"cache-control"
+CONNECTION = b"connection"
+CONTENT_ENCODING = b"content-encoding"
+CONTENT_LENGTH = b"content-length"
+CONTENT_TYPE = b"content-type"
+COOKIE = b"cookie"
+ETAG = b"etag"
+IF_MATCH = b"if-match"
+IF_MODIFIED_SINCE = b"if-modified-since"
+IF_NONE_MATCH = b"if-none-match"
+IF_RANGE = b"if-range"
+LAST_MODIFIED = b"last-modified"
+ORIGIN = b"origin"
+RANGE = b"range"
+REFERER = b"referer"
+SET_COOKIE = b"set-cookie"
+TRANSFER_ENCODING = b"transfer-encoding"
+USER_AGENT = b"user-agent"
+VARY = b"vary"
+X_FORWARDED_FOR = b"x-forwarded-for"
+X_REAL_IP = b"x-real-ip"
+X_REQUEST_ID = b"x-request-id"
+
+_COMMON_HEADER_KEYS = {}
+for _key in (HOST, ACCEPT, ACCEPT_ENCODING, ACCEPT_LANGUAGE, AUTHORIZATION, CACHE_CONTROL,
+             CONNECTION, CONTENT_ENCODING, CONTENT_LENGTH, CONTENT_TYPE, COOKIE, ETAG, IF_MATCH,
+             IF_MODIFIED_SINCE, IF_NONE_MATCH, IF_RANGE, LAST_MODIFIED, ORIGIN, RANGE, REFERER,
+             SET_COOKIE, TRANSFER_ENCODING, USER_AGENT, VARY, X_FORWARDED_FOR, X_REAL_IP, X_REQUEST_ID):
+    _name = _key.decode("latin-1")
+    _COMMON_HEADER_KEYS[_key] = _key
+    _COMMON_HEADER_KEYS[_name] = _key
+    _COMMON_HEADER_KEYS[_name.title()] = _key
+del _key, _name
+
+
+def header_key(key: typing.Union[str, bytes]) -> bytes:
+    """
+    把头名称转换成小写bytes，常用名称直接查表
+    """
+    try:
+        return _COMMON_HEADER_KEYS[key]
+    except KeyError:
+        if isinstance(key, bytes):
+            return key.lower()
+        return key.lower().encode("latin-1")
+
+
+def add_vary(headers: "MutableHeaders", value: str) -> None:
+    """
+    往Vary头追加一项，已经存在时不重复添加
+    """
+    vary = headers.get(VARY)
+    if not vary:
+        headers[VARY] = value
+    elif value.lower() not in [v.strip().lower() for v in vary.split(",")]:
+        headers[VARY] = vary + ", " + value
+
+
 class Headers(StrDict):
+    """
+    大小写不敏感的头信息，底层直接使用ASGI的[(bytes, bytes)]列表；
+    第一次按名称查找时才建立 小写名称->第一个值 的索引
+    """
+    __slots__ = ("_list", "_index")
+
     def __init__(self, raw_headers: typing.Optional[BytesPairs] = None) -> None:
         self._list = [] if raw_headers is None else raw_headers
+        self._index = None
+
+    @property
+    def raw(self) -> BytesPairs:
+        return self._list
+
+    def _get_index(self) -> dict:
+        index = self._index
+        if index is None:
+            # 反向构造，同名的头保留第一个值
+            index = self._index = dict(reversed(self._list))
+
+        return index
 
     def keys(self) -> typing.List[str]:
         return [k.decode("latin-1") for k, _ in self._list]
@@ -154,32 +304,35 @@ class Headers(StrDict):
     def items(self) -> StrPairs:
         return [(k.decode("latin-1"), v.decode("latin-1")) for k, v in self._list]
 
-    def get(self, key: str, default: typing.Any = None) -> typing.Any:
+    def get(self, key: typing.Union[str, bytes], default: typing.Any = None) -> typing.Any:
+        index = self._index
+        if index is None:
+            index = self._get_index()
+
         try:
-            return self[key]
+            value = index.get(_COMMON_HEADER_KEYS[key])
         except KeyError:
+            value = index.get(header_key(key))
+
+        if value is None:
             return default
+        return value.decode("latin-1")
 
-    def getlist(self, key: str) -> typing.List[str]:
-        temp_key = key.lower().encode("latin-1")
+    def getlist(self, key: typing.Union[str, bytes]) -> typing.List[str]:
+        temp_key = header_key(key)
         return [v.decode("latin-1") for k, v in self._list if k == temp_key]
 
     def mutable_headers(self) -> "MutableHeaders":
         return MutableHeaders(self._list[:])
 
-    def __getitem__(self, key: str) -> str:
-        temp_key = key.lower().encode("latin-1")
-        for k, v in self._list:
-            if k == temp_key:
-                return v.decode("latin-1")
-        raise KeyError(key)
+    def __getitem__(self, key: typing.Union[str, bytes]) -> str:
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
 
     def __contains__(self, key: typing.Any) -> bool:
-        temp_key = key.lower().encode("latin-1")
-        for k, v in self._list:
-            if k == temp_key:
-                return True
-        return False
+        return header_key(key) in self._get_index()
 
     def __iter__(self) -> typing.Iterator[typing.Any]:
         return iter(self.items())
@@ -198,49 +351,58 @@ class Headers(StrDict):
 
 
 class MutableHeaders(Headers):
-    def __setitem__(self, key: str, value: str):
-        set_key = key.lower().encode("latin-1")
-        set_value = value.encode("latin-1")
-
-        found_indexes = []
-        for idx, (k, v) in enumerate(self._list):
-            if k == set_key:
-                found_indexes.append(idx)
+    """
+    可修改的头信息，修改直接作用在底层的[(bytes, bytes)]列表上，
+    `raw`可以直接作为ASGI消息的headers发送，不需要重新编码；
+    新增头只需追加，只有覆盖已存在的头时才需要扫描列表
+    """
+    __slots__ = ()
+
+    def __setitem__(self, key: typing.Union[str, bytes], value: typing.Union[str, bytes]):
+        set_key = header_key(key)
+        set_value = value if isinstance(value, bytes) else value.encode("latin-1")
+
+        index = self._get_index()
+        if set_key not in index:
+            self._list.append((set_key, set_value))
+            index[set_key] = set_value
+            return
 
+        found_indexes = [idx for idx, (k, _) in enumerate(self._list) if k == set_key]
         for idx in reversed(found_indexes[1:]):
             del self._list[idx]
+        self._list[found_indexes[0]] = (set_key, set_value)
+        index[set_key] = set_value
+
+    def __delitem__(self, key: typing.Union[str, bytes]) -> None:
+        del_key = header_key(key)
+        index = self._get_index()
+        if del_key not in index:
+            return
+
+        self._list[:] = [(k, v) for k, v in self._list if k != del_key]
+        del index[del_key]
+
+    def append(self, key: typing.Union[str, bytes], value: typing.Union[str, bytes]) -> None:
+        """
+        追加一个头，不覆盖同名的头，比如Set-Cookie
+        """
+        append_key = header_key(key)
+        append_value = value if isinstance(value, bytes) else value.encode("latin-1")
+        self._list.append((append_key, append_value))
+        self._get_index().setdefault(append_key, append_value)
+
+    def setdefault(self, key: typing.Union[str, bytes], value: str) -> str:
+        set_key = header_key(key)
+        index = self._get_index()
+        if set_key in index:
+            return index[set_key].decode("latin-1")
 
-        if found_indexes:
-            idx = found_indexes[0]
-            self._list[idx] = (set_key, set_value)
-        else:
-            self._list.append((set_key, set_value))
-
-    def __delattr__(self, key: str) -> None:
-        del_key = key.lower().encode("latin-1")
-
-        pop_indexes = []
-        for idx, (k, v) in enumerate(self._list):
-            if k == del_key:
-                pop_indexes.append(idx)
-
-        for idx in reversed(pop_indexes):
-            del (self._list[idx])
-
-    def setdefault(self, key: str, value: str) -> str:
-        set_key = key.lower().encode("latin-1")
         set_value = value.encode("latin-1")
-
-        for idx, (k, v) in enumerate(self._list):
-            if k == set_key:
-                return v.decode("latin-1")
-
         self._list.append((set_key, set_value))
+        index[set_key] = set_value
         return value
 
     def update(self, other: dict) -> None:
         for k, v in other.items():
             self[k] = v
-
-
-
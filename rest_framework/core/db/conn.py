@@ -50,6 +50,22 @@ class ConnectionHandler(object):
         for setting in ['NAME', 'USER', 'PASSWORD', 'HOST', 'PORT']:
             conn.setdefault(setting, '')
 
+    def divide_budget(self, workers):
+        """
+        多进程部署时按worker个数分配连接池大小：数据库配置了CONNECTION_BUDGET（所有worker合计的最大连接数）时，
+        每个worker的MAXSIZE为CONNECTION_BUDGET // workers（至少为1），MINSIZE不超过MAXSIZE
+        :param workers: worker个数
+        """
+        for alias in self:
+            budget = self.databases[alias].get("CONNECTION_BUDGET")
+            if not budget:
+                continue
+
+            self.ensure_defaults(alias)
+            options = self.databases[alias]["OPTIONS"]
+            options["MAXSIZE"] = max(1, budget // workers)
+            options["MINSIZE"] = min(options["MINSIZE"], options["MAXSIZE"])
+
     @staticmethod
     def load_backend(backend_name):
         """
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+请求截止时间
+handler开始处理时设置，数据库查询据此给SELECT加执行时间限制，到期后取消handler中所有await；
+保存在contextvar中，Python 3.6没有contextvars，退化为保存在当前Task上，
+此时handler中自行创建的Task需用`create_task`创建才能继承截止时间
+"""
+import asyncio
+import weakref
+
+from rest_framework.core.exceptions import DeadlineExceeded
+from rest_framework.core.request import ClientDisconnect
+
+try:
+    import contextvars
+except ImportError:
+    contextvars = None
+
+if contextvars is not None:
+    _deadline = contextvars.ContextVar("request_deadline", default=None)
+
+    def get_deadline():
+        return _deadline.get()
+
+    def _set(when):
+        _deadline.set(when)
+else:
+    _task_deadlines = weakref.WeakKeyDictionary()
+
+    def get_deadline():
+        task = asyncio.Task.current_task()
+        return _task_deadlines.get(task) if task is not None else None
+
+    def _set(when):
+        task = asyncio.Task.current_task()
+        if task is not None:
+            _task_deadlines[task] = when
+
+
+def set_deadline(timeout):
+    """
+    设置当前请求的截止时间
+    :param timeout: 从现在开始的秒数，None表示不限制
+    :return: 截止时间（事件循环时间）
+    """
+    when = None if timeout is None else asyncio.get_event_loop().time() + timeout
+    _set(when)
+    return when
+
+
+def remaining():
+    """
+    距截止时间的秒数，已过期时小于等于0，没有截止时间时返回None
+    """
+    when = get_deadline()
+    if when is None:
+        return None
+    return when - asyncio.get_event_loop().time()
+
+
+def check():
+    """
+    已过截止时间时抛出DeadlineExceeded，用于开始一项耗时操作之前
+    """
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded()
+
+
+def create_task(coro):
+    """
+    创建继承当前截止时间的Task
+    """
+    when = get_deadline()
+    task = asyncio.ensure_future(coro)
+    if contextvars is None and when is not None:
+        _task_deadlines[task] = when
+    return task
+
+
+async def run(coro, disconnect=None):
+    """
+    运行coro，到截止时间时取消并抛出DeadlineExceeded；
+    disconnect（等待客户端断开的协程）先完成时取消并抛出ClientDisconnect
+    :param coro:
+    :param disconnect:
+    :return: coro的返回值
+    """
+    task = create_task(coro)
+    watcher = asyncio.ensure_future(disconnect) if disconnect is not None else None
+    waiters = {task} if watcher is None else {task, watcher}
+    try:
+        done, _ = await asyncio.wait(waiters, timeout=remaining(), return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    finally:
+        if watcher is not None:
+            watcher.cancel()
+
+    if task in done:
+        return task.result()
+
+    # 等待handler处理完取消（如关闭数据库连接、发送KILL QUERY）
+    task.cancel()
+    try:
+        await task
+    except (asyncio.CancelledError, Exception):
+        pass
+
+    if watcher is not None and watcher in done:
+        raise ClientDisconnect()
+    raise DeadlineExceeded()
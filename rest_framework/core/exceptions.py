@@ -177,6 +177,33 @@ class ParseError(APIException):
     default_code = 'parse_error'
 
 
+class RequestEntityTooLarge(APIException):
+    """
+    请求体超过限制
+    """
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = _('Request body too large')
+    default_code = 'body_too_large'
+
+
+class PreconditionFailed(APIException):
+    """
+    If-Match不匹配，资源已被修改
+    """
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = _('Resource has been modified')
+    default_code = 'precondition_failed'
+
+
+class DeadlineExceeded(APIException):
+    """
+    请求处理超过截止时间
+    """
+    status_code = status.HTTP_504_GATEWAY_TIMEOUT
+    default_detail = _('Request processing timed out')
+    default_code = 'deadline_exceeded'
+
+
 class PaginationError(APIException):
     """
     分页异常
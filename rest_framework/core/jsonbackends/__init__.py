@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+JSON编解码后端，由`settings.JSON_BACKEND`选择
+每个后端模块提供`Handler`：`dumps`返回bytes，`dumps_text`返回str，`loads`接受bytes或str；
+datetime/date/time序列化为ISO 8601字符串，Decimal、UUID、LazyString序列化为字符串
+"""
+import datetime
+from decimal import Decimal
+from uuid import UUID
+
+from rest_framework.core.translation import LazyString
+
+# JSON_BACKEND为None时按顺序选择第一个已安装的；
+# ujson需要先递归转换Decimal等类型，比标准库慢，不自动选择
+AUTO_BACKENDS = (
+    "rest_framework.core.jsonbackends.orjson",
+    "rest_framework.core.jsonbackends.rapidjson",
+    "rest_framework.core.jsonbackends.stdlib",
+)
+
+
+def default(o):
+    """
+    JSON库不支持的类型的转换，供各后端的`default`参数使用
+    """
+    if isinstance(o, (datetime.datetime, datetime.date, datetime.time)):
+        return o.isoformat()
+    if isinstance(o, (Decimal, UUID, LazyString)):
+        return str(o)
+    raise TypeError("%r is not JSON serializable" % o)
+
+
+def prepare(value):
+    """
+    递归把不支持的类型转换为字符串，用于不支持`default`参数或会把Decimal转为数字的JSON库；
+    超出64位的整数抛出OverflowError（部分ujson版本不报错而是输出无效的JSON）
+    """
+    if isinstance(value, dict):
+        return {k: prepare(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [prepare(v) for v in value]
+    if isinstance(value, int) and not -2 ** 63 <= value < 2 ** 64:
+        raise OverflowError("int too big to convert")
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    try:
+        return default(value)
+    except TypeError:
+        return value
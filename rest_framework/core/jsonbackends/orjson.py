@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+import orjson
+
+from rest_framework.core.jsonbackends import default, stdlib
+
+OPTIONS = orjson.OPT_NON_STR_KEYS
+fallback = stdlib.Handler()
+
+
+class Handler:
+    """
+    orjson直接输出bytes，原生支持datetime、UUID；
+    超出64位的整数等orjson不支持的值交给标准库json编码，与其他后端结果一致
+    """
+    name = "orjson"
+
+    def dumps(self, value):
+        try:
+            return orjson.dumps(value, default=default, option=OPTIONS)
+        except TypeError:
+            return fallback.dumps(value)
+
+    def dumps_text(self, value):
+        return self.dumps(value).decode("utf-8")
+
+    def loads(self, value):
+        return orjson.loads(value)
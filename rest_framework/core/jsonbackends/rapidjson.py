@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+import rapidjson
+
+from rest_framework.core.jsonbackends import default, stdlib
+
+fallback = stdlib.Handler()
+
+
+class Encoder(rapidjson.Encoder):
+    def default(self, o):
+        return default(o)
+
+
+class Handler:
+    """
+    python-rapidjson原生支持datetime（ISO 8601）、UUID；非字符串的key等不支持的值交给标准库json编码
+    """
+    name = "rapidjson"
+
+    def __init__(self):
+        self.encoder = Encoder(
+            ensure_ascii=False,
+            datetime_mode=rapidjson.DM_ISO8601,
+            uuid_mode=rapidjson.UM_CANONICAL,
+        )
+
+    def dumps_text(self, value):
+        try:
+            return self.encoder(value)
+        except (TypeError, OverflowError):
+            return fallback.dumps_text(value)
+
+    def dumps(self, value):
+        return self.dumps_text(value).encode("utf-8")
+
+    def loads(self, value):
+        return rapidjson.loads(value)
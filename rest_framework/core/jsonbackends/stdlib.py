@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+import json
+
+from rest_framework.core.jsonbackends import default
+
+
+class JSONEncoder(json.JSONEncoder):
+    def default(self, o):
+        return default(o)
+
+
+class Handler:
+    name = "stdlib"
+
+    def __init__(self):
+        self.encoder = JSONEncoder(ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+
+    def dumps(self, value):
+        return self.encoder.encode(value).encode("utf-8")
+
+    def dumps_text(self, value):
+        return self.encoder.encode(value)
+
+    def loads(self, value):
+        return json.loads(value)
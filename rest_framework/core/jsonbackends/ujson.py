@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+import ujson
+
+from rest_framework.core.jsonbackends import prepare, stdlib
+
+fallback = stdlib.Handler()
+
+
+class Handler:
+    """
+    ujson会把Decimal直接转为数字，编码前先递归转换datetime、Decimal等类型，与其他后端一样输出字符串；
+    超出64位的整数等ujson不支持的值交给标准库json编码
+    """
+    name = "ujson"
+
+    def dumps_text(self, value):
+        try:
+            return ujson.dumps(prepare(value), ensure_ascii=False, escape_forward_slashes=False)
+        except (TypeError, OverflowError):
+            return fallback.dumps_text(value)
+
+    def dumps(self, value):
+        return self.dumps_text(value).encode("utf-8")
+
+    def loads(self, value):
+        return ujson.loads(value)
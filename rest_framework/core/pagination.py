@@ -4,7 +4,6 @@
 """
 from math import ceil
 from collections import OrderedDict
-from rest_framework.core.response import Response
 from rest_framework.core.translation import lazy_translate as _
 from rest_framework.core.exceptions import PaginationError
 from rest_framework.lib.orm.query import AsyncEmptyQuery
@@ -211,7 +210,7 @@ class PageNumberPagination(BasePagination):
 
     async def get_paginated_response(self, data):
         count = self.paginator.count
-        return Response(OrderedDict([
+        return self.request_handler.write_response(OrderedDict([
             ('count', count),
             ('num_pages', self.paginator.num_pages),
             ('results', data)
@@ -285,7 +284,7 @@ class LimitOffsetPagination(BasePagination):
         return list(queryset[self.offset:self.offset + self.limit])
 
     def get_paginated_response(self, data):
-        return Response(OrderedDict([
+        return self.request_handler.write_response(OrderedDict([
             ('count', self.count),
             ('results', data)
         ]))
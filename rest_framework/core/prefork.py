@@ -0,0 +1,332 @@
+# -*- coding: utf-8 -*-
+"""
+多进程（pre-fork）服务
+master进程只加载一次应用并冻结gc，随后fork出多个worker共享监听socket；
+worker崩溃自动重启，处理完max_requests（加随机抖动）个请求后自动回收，
+收到SIGHUP时逐个滚动重启worker，SIGTERM/SIGINT时优雅停止
+"""
+import os
+import gc
+import time
+import errno
+import random
+import select
+import signal
+import socket
+import logging
+import functools
+
+from uvicorn.main import Server
+from uvicorn.config import Config
+
+from rest_framework.core.db import databases
+from rest_framework.log import reinit_after_fork, shutdown_logging
+
+logger = logging.getLogger(__name__)
+
+# worker未能开始监听（lifespan startup失败、绑定端口失败等）时的退出码，master收到后停止服务
+WORKER_BOOT_ERROR = 3
+# worker在master中注册过的信号，fork后恢复默认处理
+MASTER_SIGNALS = (signal.SIGHUP, signal.SIGTERM, signal.SIGINT, signal.SIGQUIT, signal.SIGCHLD)
+
+
+class HaltServer(Exception):
+    pass
+
+
+def create_socket(host, port, backlog=2048, reuse_port=False):
+    """
+    创建监听socket
+    :param host:
+    :param port:
+    :param backlog: listen队列长度
+    :param reuse_port: 是否设置SO_REUSEPORT，由内核在多个worker的socket间分配连接
+    :return:
+    """
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    # 响应头和响应体分开写入，不关闭Nagle算法时会与客户端的延迟确认叠加出约40ms的延迟；
+    # Linux上accept得到的连接会继承该选项
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.setblocking(False)
+    sock.set_inheritable(True)
+    return sock
+
+
+class SocketServer(Server):
+    """
+    在已创建的socket上提供服务的uvicorn Server；
+    作为worker运行时，lifespan startup完成、开始监听后通过ready_fd管道通知master
+    """
+
+    def __init__(self, config, sock, ready_fd=None):
+        super().__init__(config)
+        self.sock = sock
+        self.ready_fd = ready_fd
+        self.ready = False
+
+    async def create_server(self):
+        config = self.config
+        create_protocol = functools.partial(
+            config.http_protocol_class, config=config, server_state=self.server_state
+        )
+        self.server = await self.loop.create_server(create_protocol, sock=self.sock)
+        self.ready = True
+        self.logger.info("Process [%d] listening on %s" % (self.pid, self.sock.getsockname()))
+        if self.ready_fd is not None:
+            os.write(self.ready_fd, b"1")
+            os.close(self.ready_fd)
+
+
+class Worker:
+    __slots__ = ("pid", "ready_fd", "ready", "retiring", "killed_at")
+
+    def __init__(self, pid, ready_fd):
+        self.pid = pid
+        self.ready_fd = ready_fd
+        self.ready = False
+        # 滚动重启时待替换的旧worker
+        self.retiring = False
+        self.killed_at = None
+
+    def close(self):
+        if self.ready_fd is not None:
+            os.close(self.ready_fd)
+            self.ready_fd = None
+
+
+class Arbiter:
+    """
+    管理worker进程的master
+    """
+
+    def __init__(self, app, host="127.0.0.1", port=5000, workers=2, max_requests=0,
+                 max_requests_jitter=0, reuse_port=False, graceful_timeout=30, backlog=2048,
+                 **config_kwargs):
+        """
+        :param app: 已加载的ASGI应用
+        :param workers: worker个数
+        :param max_requests: 每个worker处理多少个请求后自动重启，0表示不限制
+        :param max_requests_jitter: 在max_requests上增加0到该值的随机数，避免worker同时重启
+        :param reuse_port: 每个worker各自以SO_REUSEPORT绑定端口，否则共享master创建的socket
+        :param graceful_timeout: 停止worker时等待其处理完请求的秒数，超时后强制结束
+        :param backlog: listen队列长度
+        :param config_kwargs: 其余传给uvicorn Config的参数，如loop、http、timeout_keep_alive、limit_concurrency、access_log
+        """
+        self.app = app
+        self.host = host
+        self.port = port
+        self.worker_count = workers
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.reuse_port = reuse_port
+        self.graceful_timeout = graceful_timeout
+        self.backlog = backlog
+        self.config_kwargs = config_kwargs
+
+        self.sock = None
+        self.workers = {}
+        self.signals = []
+        self.stopping = False
+        self.wakeup_r = self.wakeup_w = None
+
+    def run(self):
+        if not self.reuse_port:
+            self.sock = create_socket(self.host, self.port, self.backlog)
+        databases.divide_budget(self.worker_count)
+
+        # 应用已在master中加载完成，冻结现有对象，避免worker中的gc遍历改写这些对象所在的内存页，
+        # 使其一直在进程间以写时复制的方式共享
+        gc.collect()
+        if hasattr(gc, "freeze"):
+            gc.freeze()
+
+        self.init_signals()
+        logger.info(f"Master [{os.getpid()}] starting {self.worker_count} workers "
+                    f"on http://{self.host}:{self.port}")
+        try:
+            while True:
+                self.reap_workers()
+                if self.signals:
+                    sig = self.signals.pop(0)
+                    if sig == signal.SIGHUP:
+                        self.reload()
+                    elif sig != signal.SIGCHLD:
+                        logger.info(f"Master [{os.getpid()}] received signal {sig}, stopping")
+                        break
+                self.manage_workers()
+                self.sleep()
+        except HaltServer as e:
+            logger.error(str(e))
+        finally:
+            self.stop()
+            if self.sock is not None:
+                self.sock.close()
+
+    def init_signals(self):
+        self.wakeup_r, self.wakeup_w = os.pipe()
+        for fd in (self.wakeup_r, self.wakeup_w):
+            os.set_blocking(fd, False)
+        signal.set_wakeup_fd(self.wakeup_w)
+        for sig in MASTER_SIGNALS:
+            signal.signal(sig, self.handle_signal)
+
+    def handle_signal(self, sig, frame):
+        self.signals.append(sig)
+
+    def sleep(self):
+        """
+        等待信号或worker就绪通知，最多1秒
+        """
+        pending = {w.ready_fd: w for w in self.workers.values() if w.ready_fd is not None}
+        try:
+            readable, _, _ = select.select([self.wakeup_r] + list(pending), [], [], 1.0)
+        except InterruptedError:
+            return
+
+        for fd in readable:
+            if fd == self.wakeup_r:
+                try:
+                    while os.read(self.wakeup_r, 64):
+                        pass
+                except BlockingIOError:
+                    pass
+                continue
+
+            worker = pending[fd]
+            if os.read(fd, 1):
+                worker.ready = True
+            worker.close()
+
+    def spawn_worker(self):
+        ready_r, ready_w = os.pipe()
+        pid = os.fork()
+        if pid:
+            os.close(ready_w)
+            self.workers[pid] = Worker(pid, ready_r)
+            return pid
+
+        os.close(ready_r)
+        code = WORKER_BOOT_ERROR
+        try:
+            code = self.run_worker(ready_w)
+        except BaseException:
+            logger.error(f"Worker [{os.getpid()}] crashed", exc_info=True)
+            code = code or 1
+        finally:
+            # os._exit不执行atexit，需自行写完日志队列
+            shutdown_logging()
+            os._exit(code)
+
+    def run_worker(self, ready_fd):
+        """
+        worker进程入口
+        :param ready_fd: 开始监听后写入的管道
+        :return: 退出码
+        """
+        # 脱离终端的进程组，Ctrl+C只发给master，由master统一发送SIGTERM，
+        # 否则worker连续收到两个信号时uvicorn会跳过优雅关闭
+        os.setpgid(0, 0)
+        reinit_after_fork()
+        signal.set_wakeup_fd(-1)
+        for sig in MASTER_SIGNALS:
+            signal.signal(sig, signal.SIG_DFL)
+        os.close(self.wakeup_r)
+        os.close(self.wakeup_w)
+        for worker in self.workers.values():
+            worker.close()
+        random.seed()
+
+        sock = self.sock or create_socket(self.host, self.port, self.backlog, reuse_port=True)
+        limit_max_requests = None
+        if self.max_requests:
+            limit_max_requests = self.max_requests + random.randint(0, self.max_requests_jitter)
+
+        config = Config(self.app, limit_max_requests=limit_max_requests, **self.config_kwargs)
+        server = SocketServer(config, sock, ready_fd)
+        server.run()
+        return 0 if server.ready else WORKER_BOOT_ERROR
+
+    def reap_workers(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if not pid:
+                return
+
+            worker = self.workers.pop(pid, None)
+            if worker is None:
+                continue
+            worker.close()
+
+            if os.WIFSIGNALED(status):
+                logger.error(f"Worker [{pid}] was killed by signal {os.WTERMSIG(status)}")
+                continue
+
+            code = os.WEXITSTATUS(status)
+            if code == WORKER_BOOT_ERROR and not (worker.retiring or self.stopping):
+                raise HaltServer(f"Worker [{pid}] failed to boot, stopping")
+            if code:
+                logger.error(f"Worker [{pid}] exited with code {code}")
+            else:
+                logger.info(f"Worker [{pid}] exited")
+
+    def manage_workers(self):
+        """
+        补齐worker个数；滚动重启期间最多多出一个worker，新worker就绪后才停止一个旧worker
+        """
+        active = [w for w in self.workers.values() if not w.retiring]
+        retiring = [w for w in self.workers.values() if w.retiring]
+        limit = self.worker_count + (1 if retiring else 0)
+        while len(active) < self.worker_count and len(self.workers) < limit:
+            self.spawn_worker()
+            active.append(None)
+
+        if not retiring:
+            return
+
+        now = time.monotonic()
+        killing = [w for w in retiring if w.killed_at is not None]
+        for worker in killing:
+            if now - worker.killed_at > self.graceful_timeout:
+                self.kill_worker(worker.pid, signal.SIGKILL)
+
+        if not killing and all(w is not None and w.ready for w in active):
+            worker = retiring[0]
+            worker.killed_at = now
+            self.kill_worker(worker.pid, signal.SIGTERM)
+
+    def reload(self):
+        logger.info(f"Master [{os.getpid()}] rolling restart of {len(self.workers)} workers")
+        for worker in self.workers.values():
+            worker.retiring = True
+
+    def kill_worker(self, pid, sig):
+        try:
+            os.kill(pid, sig)
+        except OSError as e:
+            if e.errno != errno.ESRCH:
+                raise
+
+    def stop(self):
+        self.stopping = True
+        for pid in list(self.workers):
+            self.kill_worker(pid, signal.SIGTERM)
+
+        deadline = time.monotonic() + self.graceful_timeout
+        while self.workers and time.monotonic() < deadline:
+            self.reap_workers()
+            time.sleep(0.1)
+
+        for pid in list(self.workers):
+            self.kill_worker(pid, signal.SIGKILL)
+        while self.workers:
+            self.reap_workers()
+            time.sleep(0.1)
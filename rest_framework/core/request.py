@@ -1,8 +1,15 @@
+import io
 import typing
+import tempfile
 from collections.abc import Mapping
+from rest_framework.conf import settings
 from rest_framework.core.types import Scope, Receive
+from rest_framework.core.exceptions import RequestEntityTooLarge
 from rest_framework.utils.escape import json_decode
-from rest_framework.core.datastructures import URL, Headers, QueryParams
+from rest_framework.core.datastructures import URL, Headers, QueryParams, get_route_path
+from rest_framework.core.datastructures import CONTENT_LENGTH, TRANSFER_ENCODING
+
+_empty = object()
 
 
 class ClientDisconnect(Exception):
@@ -10,12 +17,31 @@ class ClientDisconnect(Exception):
 
 
 class Request(Mapping):
+    """
+    http请求对象，所有属性都直接从scope按需计算并缓存；
+    使用__slots__，请求级的自定义数据请放在`context`中
+    """
+    __slots__ = (
+        "_scope", "_receive", "context", "data", "files", "_stream_consumed",
+        "_method", "_path", "_url", "_headers", "_query_params", "_body", "_body_file", "_json",
+    )
+
     def __init__(self, scope: Scope, receive: Receive = None) -> None:
         assert scope["type"] == "http"
         self._scope = scope
         self._receive = receive
         self.context = {}
+        self.data = None
+        self.files = {}
         self._stream_consumed = False
+        self._method = None
+        self._path = None
+        self._url = None
+        self._headers = None
+        self._query_params = None
+        self._body = _empty
+        self._body_file = None
+        self._json = _empty
 
     def __getitem__(self, key: str) -> str:
         return self._scope[key]
@@ -26,34 +52,68 @@ class Request(Mapping):
     def __len__(self) -> int:
         return len(self._scope)
 
+    @property
+    def scope(self) -> Scope:
+        return self._scope
+
     @property
     def method(self) -> bytes:
-        return self._scope["method"].encode()
+        if self._method is None:
+            self._method = self._scope["method"].encode()
+
+        return self._method
+
+    @property
+    def path(self) -> bytes:
+        """
+        用于路由匹配的路径，不需要构造完整的URL
+        """
+        if self._path is None:
+            self._path = get_route_path(self._scope)
+
+        return self._path
 
     @property
     def url(self) -> URL:
-        if not hasattr(self, "_url"):
-            setattr(self, "_url", URL(scope=self._scope))
+        if self._url is None:
+            self._url = URL(scope=self._scope)
 
         return self._url
 
     @property
     def headers(self) -> Headers:
-        if not hasattr(self, "_headers"):
-            setattr(self, "_headers", Headers(self._scope["headers"]))
+        if self._headers is None:
+            self._headers = Headers(self._scope["headers"])
 
         return self._headers
 
     @property
     def query_params(self) -> QueryParams:
-        if not hasattr(self, "_query_params"):
-            query_string = self._scope["query_string"].decode()
-            setattr(self, "_query_params", QueryParams(query_string))
+        if self._query_params is None:
+            self._query_params = QueryParams(self._scope["query_string"].decode())
 
         return self._query_params
 
-    async def stream(self) -> typing.AsyncGenerator[bytes, None]:
-        if hasattr(self, "_body"):
+    def _check_content_length(self, max_size: int):
+        content_length = self.headers.get(CONTENT_LENGTH)
+        if content_length is None:
+            return
+
+        try:
+            content_length = int(content_length)
+        except ValueError:
+            return
+
+        if content_length > max_size:
+            raise RequestEntityTooLarge()
+
+    async def stream(self, max_size: int = _empty) -> typing.AsyncGenerator[bytes, None]:
+        """
+        逐块读取请求体，累计大小超过`max_size`时抛出RequestEntityTooLarge；
+        声明的Content-Length已经超出时不读取直接拒绝
+        :param max_size: 默认为`settings.MAX_BODY_SIZE`，None表示不限制
+        """
+        if self._body is not _empty:
             yield self._body
             return
 
@@ -63,37 +123,108 @@ class Request(Mapping):
         if self._receive is None:
             raise RuntimeError("Receive channel has not been made available")
 
+        if max_size is _empty:
+            max_size = settings.MAX_BODY_SIZE
+        if max_size is not None:
+            self._check_content_length(max_size)
+
         self._stream_consumed = True
+        received = 0
         while 1:
             message = await self._receive()
             message_type = message["type"]
 
             if message_type == "http.request":
-                yield message.get("body", b"")
+                chunk = message.get("body", b"")
+                if max_size is not None:
+                    received += len(chunk)
+                    if received > max_size:
+                        raise RequestEntityTooLarge()
+                yield chunk
                 if not message.get("more_body", False):
                     break
             elif message_type == "http.disconnect":
                 raise ClientDisconnect()
 
-    async def body(self) -> bytes:
-        if not hasattr(self, "_body"):
-            body = b""
+    def has_unread_body(self) -> bool:
+        """
+        是否还有未读取的请求体
+        """
+        if self._stream_consumed or self._body is not _empty:
+            return False
+
+        headers = self.headers
+        if TRANSFER_ENCODING in headers:
+            return True
+        return headers.get(CONTENT_LENGTH, "0") not in ("", "0")
+
+    async def wait_disconnect(self):
+        """
+        等待客户端断开连接，只能在没有未读取的请求体时调用，否则会读走请求体
+        """
+        if self._receive is None:
+            raise RuntimeError("Receive channel has not been made available")
+
+        while 1:
+            message = await self._receive()
+            if message["type"] == "http.disconnect":
+                return
 
+    async def body(self) -> bytes:
+        if self._body is _empty:
+            if self._body_file is not None:
+                self._body_file.seek(0)
+                self._body = self._body_file.read()
+                self._body_file.seek(0)
+                return self._body
+
+            chunks = []
             async for chunk in self.stream():
-                body += chunk
+                if chunk:
+                    chunks.append(chunk)
 
-            setattr(self, "_body", body)
+            # 只有一块时直接使用，不再拷贝
+            self._body = chunks[0] if len(chunks) == 1 else b"".join(chunks)
 
         return self._body
 
+    async def body_file(self) -> typing.BinaryIO:
+        """
+        以文件对象的形式返回请求体，超过`settings.BODY_SPOOL_THRESHOLD`的部分写入临时文件，
+        大请求体不会全部放在内存里
+        """
+        if self._body_file is None:
+            if self._body is not _empty:
+                self._body_file = io.BytesIO(self._body)
+            else:
+                threshold = settings.BODY_SPOOL_THRESHOLD
+                if threshold is None:
+                    body_file = io.BytesIO()
+                else:
+                    body_file = tempfile.SpooledTemporaryFile(max_size=threshold)
+                async for chunk in self.stream():
+                    body_file.write(chunk)
+                body_file.seek(0)
+                self._body_file = body_file
+
+        return self._body_file
+
     async def json(self) -> typing.Any:
-        if not hasattr(self, "_json"):
+        if self._json is _empty:
             body = await self.body()
-            json_data = json_decode(body) if body else {}
-            setattr(self, "_json", json_data)
+            self._json = json_decode(body) if body else {}
 
         return self._json
 
+    async def close(self):
+        if self._body_file is not None:
+            self._body_file.close()
+            self._body_file = None
+
+        for value in self.files.values():
+            for upload_file in (value if isinstance(value, list) else (value,)):
+                upload_file.close()
+
     def client_ip(self):
         return self._scope["client"][0]
 
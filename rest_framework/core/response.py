@@ -1,21 +1,57 @@
+import os
+import stat
 import typing
+import asyncio
+import logging
+import mimetypes
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+from rest_framework.conf import settings
+from rest_framework.core.exceptions import DeadlineExceeded
 from rest_framework.core.types import Receive, Send
-from rest_framework.utils.escape import json_encode
+from rest_framework.core.codecs import JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPES, msgpack_handler
+from rest_framework.core.datastructures import MutableHeaders, RANGE, IF_RANGE, CONTENT_TYPE, CONTENT_LENGTH
+from rest_framework.utils import status
+from rest_framework.utils.escape import json_encode_bytes
+from rest_framework.utils.timezone import http_date
+
+logger = logging.getLogger(__name__)
 
 
 class Response:
     charset = "utf-8"
+    # 响应发送完成后执行的后台任务（BackgroundTask/BackgroundTasks）
+    background = None
 
     def __init__(self, data: typing.Any, status_code: int = 200, headers: dict = None,
-                 content_type="application/json") -> None:
+                 content_type="application/json", background=None) -> None:
+        self.background = background
         self.content_type = content_type
+        self.data = data
         self.body = self.render(data)
         self.status_code = status_code
         self.init_headers(headers)
 
+    @classmethod
+    def from_rendered(cls, body: bytes, status_code: int, raw_headers: list) -> "Response":
+        """
+        由已渲染的响应体和响应头构造，不再渲染，如读取缓存的响应
+        """
+        response = cls.__new__(cls)
+        response.data = None
+        response.body = body
+        response.status_code = status_code
+        response.raw_headers = raw_headers
+        response.content_type = response.headers.get(CONTENT_TYPE)
+        return response
+
     def render(self, content: typing.Any) -> bytes:
-        if self.content_type == "application/json":
-            return json_encode(content).encode(self.charset)
+        if self.content_type == JSON_MEDIA_TYPE:
+            return json_encode_bytes(content)
+
+        if self.content_type in MSGPACK_MEDIA_TYPES:
+            return msgpack_handler.dumps(content)
 
         if isinstance(content, bytes):
             return content
@@ -33,8 +69,8 @@ class Response:
                 for k, v in headers.items()
             ]
             keys = [h[0] for h in raw_headers]
-            populate_content_length = b"content-length" in keys
-            populate_content_type = b"content-type" in keys
+            populate_content_length = b"content-length" not in keys
+            populate_content_type = b"content-type" not in keys
 
         body = getattr(self, "body", None)
         if body is not None and populate_content_length:
@@ -49,6 +85,23 @@ class Response:
 
         self.raw_headers = raw_headers
 
+    def set_content_type(self, content_type: str) -> None:
+        """
+        按新的content_type重新渲染响应体
+        """
+        self.content_type = content_type
+        self.body = self.render(self.data)
+        headers = self.headers
+        headers[CONTENT_TYPE] = content_type
+        headers[CONTENT_LENGTH] = str(len(self.body))
+
+    @property
+    def headers(self) -> MutableHeaders:
+        """
+        直接操作raw_headers的可修改头信息
+        """
+        return MutableHeaders(self.raw_headers)
+
     async def __call__(self, receive: Receive, send: Send) -> None:
         await send(
             {
@@ -58,3 +111,197 @@ class Response:
             }
         )
         await send({"type": "http.response.body", "body": self.body})
+
+
+class StreamingResponse(Response):
+    """
+    分块发送响应体，`content`为异步迭代器（bytes或str），每块作为一个`more_body=True`的消息发送，
+    不设置Content-Length
+    """
+
+    def __init__(self, content: typing.AsyncIterable, status_code: int = 200, headers: dict = None,
+                 content_type="application/json", background=None) -> None:
+        self.background = background
+        self.content_type = content_type
+        self.body_iterator = content
+        self.status_code = status_code
+        self.init_headers(headers)
+
+    async def __call__(self, receive: Receive, send: Send) -> None:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            }
+        )
+        try:
+            async for chunk in self.body_iterator:
+                if not isinstance(chunk, bytes):
+                    chunk = chunk.encode(self.charset)
+                if chunk:
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        except DeadlineExceeded:
+            # 响应头已经发出，无法再返回504；不发送结束消息，由服务器关闭连接，客户端能发现响应体不完整
+            logger.warning("streaming response aborted, deadline exceeded")
+            return
+        finally:
+            # 客户端断开等原因中途停止时立即关闭迭代器，释放其占用的数据库连接等资源
+            aclose = getattr(self.body_iterator, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+class FileResponse(Response):
+    """
+    从磁盘发送文件，支持Range/If-Range（206）
+    服务器支持`http.response.zerocopysend`扩展时直接交给服务器发送，否则在线程池中按块读取，
+    每次下载占用的内存不超过一块，事件循环不会阻塞在磁盘读取上
+    """
+    zerocopy_extension = "http.response.zerocopysend"
+
+    def __init__(self, path: str, request=None, status_code: int = 200, headers: dict = None,
+                 content_type: str = None, filename: str = None, stat_result: os.stat_result = None,
+                 chunk_size: int = None, background=None) -> None:
+        """
+        :param path: 文件路径
+        :param request: 传入时支持Range请求及zerocopysend
+        :param filename: 下载文件名，设置时添加`Content-Disposition: attachment`
+        :param stat_result: 已经获取的文件信息，不传时在线程池中获取
+        :param chunk_size: 每次读取的字节数，默认为`settings.FILE_RESPONSE_CHUNK_SIZE`
+        :param background: 响应发送完成后执行的后台任务
+        """
+        self.background = background
+        self.path = path
+        self.request = request
+        self.status_code = status_code
+        self.filename = filename
+        self.stat_result = stat_result
+        self.chunk_size = chunk_size or settings.FILE_RESPONSE_CHUNK_SIZE
+        if content_type is None:
+            content_type = mimetypes.guess_type(filename or path)[0] or "application/octet-stream"
+        self.content_type = content_type
+        self.init_headers(headers)
+
+        if filename is not None:
+            disposition = "attachment; filename*=utf-8''{0}".format(quote(filename))
+            self.raw_headers.append((b"content-disposition", disposition.encode("latin-1")))
+
+    @staticmethod
+    def make_etag(stat_result: os.stat_result) -> str:
+        return '"%x-%x"' % (int(stat_result.st_mtime), stat_result.st_size)
+
+    def parse_range(self, file_size: int, etag: str, last_modified: str):
+        """
+        :return: None表示返回整个文件，(start, end)为闭区间，范围无法满足时返回False
+        只支持单个范围，多个范围时返回整个文件
+        """
+        if self.request is None or self.status_code != 200 or file_size == 0:
+            return None
+
+        headers = self.request.headers
+        range_header = headers.get(RANGE)
+        if not range_header or not range_header.startswith("bytes="):
+            return None
+
+        if_range = headers.get(IF_RANGE)
+        if if_range and if_range.strip() not in (etag, last_modified):
+            return None
+
+        ranges = range_header[6:].split(",")
+        if len(ranges) != 1:
+            return None
+
+        start, sep, end = ranges[0].strip().partition("-")
+        try:
+            if not sep:
+                return None
+            if not start:
+                # bytes=-500，最后500个字节
+                length = int(end)
+                if length <= 0:
+                    return False
+                return max(0, file_size - length), file_size - 1
+
+            start = int(start)
+            end = int(end) if end else file_size - 1
+        except ValueError:
+            return None
+
+        if start >= file_size or end < start:
+            return False
+        return start, min(end, file_size - 1)
+
+    async def __call__(self, receive: Receive, send: Send) -> None:
+        loop = asyncio.get_event_loop()
+        stat_result = self.stat_result
+        if stat_result is None:
+            try:
+                stat_result = await loop.run_in_executor(None, os.stat, self.path)
+            except OSError:
+                stat_result = None
+        if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+            await send({"type": "http.response.start", "status": status.HTTP_404_NOT_FOUND, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        file_size = stat_result.st_size
+        etag = self.make_etag(stat_result)
+        last_modified = http_date(datetime.fromtimestamp(stat_result.st_mtime, timezone.utc))
+        headers = MutableHeaders(list(self.raw_headers))
+        headers.setdefault("etag", etag)
+        headers.setdefault("last-modified", last_modified)
+        headers["accept-ranges"] = "bytes"
+
+        status_code = self.status_code
+        byte_range = self.parse_range(file_size, etag, last_modified)
+        if byte_range is False:
+            headers["content-range"] = "bytes */%d" % file_size
+            headers["content-length"] = "0"
+            await send({
+                "type": "http.response.start",
+                "status": status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                "headers": headers.raw,
+            })
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        if byte_range is None:
+            offset, count = 0, file_size
+        else:
+            status_code = status.HTTP_206_PARTIAL_CONTENT
+            offset, count = byte_range[0], byte_range[1] - byte_range[0] + 1
+            headers["content-range"] = "bytes %d-%d/%d" % (byte_range[0], byte_range[1], file_size)
+        headers["content-length"] = str(count)
+
+        await send({"type": "http.response.start", "status": status_code, "headers": headers.raw})
+        if count == 0 or (self.request is not None and self.request.method == b"HEAD"):
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        file = await loop.run_in_executor(None, open, self.path, "rb")
+        try:
+            extensions = (self.request.scope.get("extensions") or {}) if self.request is not None else {}
+            if self.zerocopy_extension in extensions:
+                await send({
+                    "type": self.zerocopy_extension, "file": file,
+                    "offset": offset, "count": count, "more_body": False,
+                })
+                return
+
+            if offset:
+                await loop.run_in_executor(None, file.seek, offset)
+            remaining = count
+            while remaining > 0:
+                chunk = await loop.run_in_executor(None, file.read, min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                # 发送过程中文件被截断
+                await send({"type": "http.response.body", "body": b""})
+        finally:
+            await loop.run_in_executor(None, file.close)
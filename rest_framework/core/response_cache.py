@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+响应缓存
+缓存渲染完成的响应体和响应头，命中时直接返回，不再执行handler、序列化和JSON编码；
+缓存key由请求方法、路径、排序后的查询参数及指定的请求头组成，
+缓存的SERIALIZER需能保存bytes（null、pickle、msgpack）
+"""
+import time
+import asyncio
+import hashlib
+import logging
+from urllib.parse import parse_qsl, urlencode
+
+from rest_framework.core import deadline
+from rest_framework.core.cache import caches
+from rest_framework.core.conditional import is_not_modified, not_modified_response
+from rest_framework.core.datastructures import AUTHORIZATION, COOKIE, ETAG, SET_COOKIE, VARY
+from rest_framework.core.response import Response, StreamingResponse, FileResponse
+from rest_framework.utils import status
+from rest_framework.utils.escape import json_decode, json_encode_bytes
+
+logger = logging.getLogger(__name__)
+
+AGE = "Age"
+X_CACHE = "X-Cache"
+CACHEABLE_METHODS = (b"GET", b"HEAD")
+
+
+class ResponseCache:
+    """
+    按handler类创建，保存在分发计划中
+    """
+
+    def __init__(self, timeout, alias="default", vary=(), key_prefix="response"):
+        """
+        :param timeout: 缓存秒数
+        :param alias: settings.CACHES中的别名
+        :param vary: 影响响应内容、需要加入缓存key的请求头，包含Authorization、Cookie时才缓存带对应请求头的请求
+        :param key_prefix:
+        """
+        self.timeout = timeout
+        self.alias = alias
+        self.vary = tuple(vary)
+        self.key_prefix = key_prefix
+        names = {name.lower() for name in self.vary}
+        # 带认证信息或会话Cookie的请求默认不缓存，避免把一个用户的响应返回给其他用户
+        self.private_headers = tuple(
+            header for header in (AUTHORIZATION, COOKIE) if header.decode("latin-1") not in names
+        )
+
+    def make_key(self, request):
+        """
+        :return: 不缓存该请求时返回None
+        """
+        if request.method not in CACHEABLE_METHODS:
+            return None
+        headers = request.headers
+        for header in self.private_headers:
+            if header in headers:
+                return None
+
+        query = urlencode(sorted(parse_qsl(request.scope.get("query_string", b"").decode("latin-1"),
+                                           keep_blank_values=True)))
+        sha1 = hashlib.sha1(request.method + b" " + request.path)
+        sha1.update(b"?" + query.encode("latin-1"))
+        for name in self.vary:
+            sha1.update(b"\0" + headers.get(name, "").encode("latin-1"))
+        return "%s:%s" % (self.key_prefix, sha1.hexdigest())
+
+    @staticmethod
+    def is_cacheable(response):
+        if not isinstance(response, Response) or isinstance(response, (StreamingResponse, FileResponse)):
+            return False
+        return response.status_code == status.HTTP_200_OK and SET_COOKIE not in response.headers
+
+    @staticmethod
+    def dumps(response):
+        """
+        响应头（JSON）、换行、响应体依次拼接为bytes
+        """
+        raw_headers = [[k.decode("latin-1"), v.decode("latin-1")] for k, v in response.raw_headers]
+        head = json_encode_bytes([time.time(), response.status_code, raw_headers])
+        return head + b"\n" + response.body
+
+    @staticmethod
+    def loads(value):
+        head, _, body = value.partition(b"\n")
+        created, status_code, raw_headers = json_decode(head)
+        raw_headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in raw_headers]
+        return created, Response.from_rendered(body, status_code, raw_headers)
+
+    async def load(self, request, key):
+        """
+        读取缓存的响应，带If-None-Match且与缓存的ETag一致时返回304
+        :return: 未命中时返回None
+        """
+        cache = caches[self.alias]
+        try:
+            value = cache.get(key)
+            if asyncio.iscoroutine(value):
+                # 在handler之前执行，不受deadline.run保护，按请求剩余时间限制等待
+                value = await asyncio.wait_for(value, deadline.remaining())
+        except asyncio.TimeoutError:
+            logger.warning("Get response cache timed out, request deadline exceeded")
+            return None
+        except Exception:
+            logger.exception("Get response cache error, Exception possibly due to cache backend")
+            return None
+        if not isinstance(value, bytes):
+            return None
+
+        created, response = self.loads(value)
+        headers = response.headers
+        etag = headers.get(ETAG)
+        if etag is not None and is_not_modified(request, etag):
+            response = not_modified_response(etag, vary=headers.get(VARY))
+            headers = response.headers
+        headers[AGE] = str(max(0, int(time.time() - created)))
+        headers[X_CACHE] = "HIT"
+        return response
+
+    async def store(self, key, value):
+        cache = caches[self.alias]
+        try:
+            result = cache.set(key, value, timeout=self.timeout)
+            if asyncio.iscoroutine(result):
+                await result
+        except Exception:
+            logger.exception("Set response cache error, Exception possibly due to cache backend")
+
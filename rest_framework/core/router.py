@@ -1,7 +1,7 @@
 import re
-import hashlib
+import uuid
 import logging
-from collections import deque
+from collections import OrderedDict
 from typing import Tuple, Iterable, Union
 from inspect import iscoroutinefunction
 
@@ -13,49 +13,161 @@ from rest_framework.core.websockets import WebSocket
 logger = logging.getLogger(__name__)
 
 
+class BaseConverter:
+    """
+    路由参数转换器，`regex`限定参数段的格式，`to_python`把参数转换成handler需要的类型；
+    `to_python`抛出ValueError表示该段不匹配，路由会继续尝试其它规则
+    """
+    regex = "[^/]+"
+
+    def __init__(self):
+        self.compiled = re.compile(self.regex)
+
+    def to_python(self, value: str):
+        return value
+
+    def to_url(self, value) -> str:
+        return str(value)
+
+    def convert(self, segment: bytes):
+        value = segment.decode("utf-8")
+        if self.compiled.fullmatch(value) is None:
+            raise ValueError(value)
+        return self.to_python(value)
+
+
+class StringConverter(BaseConverter):
+    pass
+
+
+class IntConverter(BaseConverter):
+    regex = "[0-9]+"
+
+    def to_python(self, value: str):
+        return int(value)
+
+
+class FloatConverter(BaseConverter):
+    regex = r"[0-9]+(?:\.[0-9]+)?"
+
+    def to_python(self, value: str):
+        return float(value)
+
+
+class UUIDConverter(BaseConverter):
+    regex = "[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}"
+
+    def to_python(self, value: str):
+        return uuid.UUID(value)
+
+
+class SlugConverter(BaseConverter):
+    regex = "[-a-zA-Z0-9_]+"
+
+
+class PathConverter(BaseConverter):
+    regex = ".+"
+
+
+DEFAULT_CONVERTERS = {
+    "str": StringConverter(),
+    "int": IntConverter(),
+    "float": FloatConverter(),
+    "uuid": UUIDConverter(),
+    "slug": SlugConverter(),
+    "path": PathConverter(),
+}
+
+
 class PatternParser:
     PARAM_REGEX = re.compile(b"(\(\?P<.*?>.*?\)|<.*?>)")
+    PARAM_SEGMENT_REGEX = re.compile(b"^<[^<>/]+>$")
     DYNAMIC_CHARS = bytearray(b'*?.[]()<>')
+    REGEX_CHARS = bytearray(b'*?[]()<>{}+|^$\\')
 
-    CAST = {
-        str: lambda x: x.decode('utf-8'),
-        int: lambda x: int(x),
-        float: lambda x: float(x)
-    }
+    CONVERTERS = DEFAULT_CONVERTERS
 
     @classmethod
     def validate_param_name(cls, name: bytes):
-        # TODO:
-        if b':' in name:
+        if not name or not name.decode().isidentifier():
             raise RouteConfigurationError(
                 'Special characters are not allowed in param name. '
-                'Use type hints in function parameters to cast the variable '
+                'Use converters like <int:id> to cast the variable '
                 'or regexes with named groups to ensure only a specific URL matches.'
             )
 
     @classmethod
-    def extract_params(cls, pattern: bytes) -> tuple:
+    def parse_param(cls, param: bytes) -> tuple:
         """
+        解析`<name>`或`<converter:name>`，返回(参数名, 转换器)
+        :param param: 去掉了<>的参数定义
+        :return:
+        """
+        converter_name, sep, name = param.partition(b":")
+        if not sep:
+            converter_name, name = b"str", param
+
+        try:
+            converter = cls.CONVERTERS[converter_name.decode()]
+        except KeyError:
+            raise RouteConfigurationError(
+                'Unknown path converter `{0}`'.format(converter_name.decode())
+            )
+
+        cls.validate_param_name(name)
+        return name.decode(), converter
 
+    @classmethod
+    def extract_params(cls, pattern: bytes) -> tuple:
+        """
         :param pattern:
-        :return:
+        :return: (正则, 参数名列表, 用于反向生成url的规则, {参数名: 转换器})
         """
         params = []
+        converters = {}
         new_pattern = pattern
         simplified_pattern = pattern
         groups = cls.PARAM_REGEX.findall(pattern)
         for group in groups:
             if group.startswith(b"(?P"):
                 name = group[group.find(b"<") + 1: group.find(b">")]
+                cls.validate_param_name(name)
+                name = name.decode()
+                converter = None
                 simplified_pattern = new_pattern
             else:
-                name = group[1:-1]  # Removing <> chars
-                simplified_pattern = simplified_pattern.replace(group, b'$' + name)
-                new_pattern = new_pattern.replace(group, b'(?P<' + name + b'>[^/]+)')
+                name, converter = cls.parse_param(group[1:-1])  # Removing <> chars
+                simplified_pattern = simplified_pattern.replace(group, b'$' + name.encode())
+                new_pattern = new_pattern.replace(
+                    group, b'(?P<' + name.encode() + b'>' + converter.regex.encode() + b')'
+                )
 
-            cls.validate_param_name(name)
-            params.append(name.decode())
-        return re.compile(new_pattern), params, simplified_pattern
+            params.append(name)
+            converters[name] = converter
+        return re.compile(new_pattern), params, simplified_pattern, converters
+
+    @classmethod
+    def split_segments(cls, pattern: bytes) -> list or None:
+        """
+        将路由规则按`/`拆分成段，供前缀树使用；
+        每段要么是纯静态字符串，要么是完整的`<param>`，`<path:..>`只能是最后一段，
+        否则返回None，只能走正则匹配
+        :param pattern:
+        :return: 静态段为bytes，参数段为转换器实例
+        """
+        segments = []
+        raw_segments = pattern.split(b"/")
+        for index, segment in enumerate(raw_segments):
+            if cls.PARAM_SEGMENT_REGEX.match(segment):
+                _, converter = cls.parse_param(segment[1:-1])
+                if isinstance(converter, PathConverter) and index != len(raw_segments) - 1:
+                    return None
+                segments.append(converter)
+                continue
+            if any(char in cls.REGEX_CHARS for char in segment):
+                return None
+            segments.append(segment)
+        return segments
 
     @classmethod
     def is_dynamic_pattern(cls, pattern: bytes) -> bool:
@@ -67,30 +179,186 @@ class PatternParser:
         return False
 
 
+class RouteMatch:
+    """
+    路由匹配结果，参数已经过转换器转换，直接传给handler
+    """
+    __slots__ = ("route", "params")
+
+    def __init__(self, route: 'Route', params: dict = None):
+        self.route = route
+        self.params = params or {}
+
+    def call_handler(self, request: Request or WebSocket):
+        return self.route.handler(request, **self.params)
+
+
+class TrieNode:
+    __slots__ = ("children", "param_children", "path_child", "route")
+
+    def __init__(self):
+        self.children = {}
+        self.param_children = []
+        self.path_child = None
+        self.route = None
+
+
+class RouteTrie:
+    """
+    按url段组织的前缀树，静态段通过字典查找，`<param>`段只在它所在的层级尝试匹配，
+    查找耗时只与url的段数有关，与注册的路由数量无关
+    """
+
+    def __init__(self):
+        self.root = TrieNode()
+        self.size = 0
+
+    def insert(self, segments: list, route: 'Route'):
+        node = self.root
+        for segment in segments:
+            if isinstance(segment, bytes):
+                node = node.children.setdefault(segment, TrieNode())
+            elif isinstance(segment, PathConverter):
+                if node.path_child is None:
+                    node.path_child = (segment, TrieNode())
+                node = node.path_child[1]
+            else:
+                for converter, child in node.param_children:
+                    if converter is segment:
+                        node = child
+                        break
+                else:
+                    child = TrieNode()
+                    node.param_children.append((segment, child))
+                    node = child
+
+        # 同一规则重复注册时，保持先注册的优先
+        if node.route is None:
+            node.route = route
+            self.size += 1
+
+    def _match(self, node: TrieNode, segments: list, index: int, values: list) -> 'Route':
+        if index == len(segments):
+            return node.route
+
+        segment = segments[index]
+        child = node.children.get(segment)
+        if child is not None:
+            route = self._match(child, segments, index + 1, values)
+            if route is not None:
+                return route
+
+        if segment:
+            for converter, child in node.param_children:
+                try:
+                    value = converter.convert(segment)
+                except ValueError:
+                    continue
+                values.append(value)
+                route = self._match(child, segments, index + 1, values)
+                if route is not None:
+                    return route
+                values.pop()
+
+        if node.path_child is not None:
+            converter, child = node.path_child
+            if child.route is not None:
+                try:
+                    values.append(converter.convert(b"/".join(segments[index:])))
+                    return child.route
+                except ValueError:
+                    pass
+
+        return None
+
+    def match(self, url: bytes) -> RouteMatch or None:
+        values = []
+        route = self._match(self.root, url.split(b"/"), 0, values)
+        if route is None:
+            return None
+        return RouteMatch(route, dict(zip(route.params_book, values)))
+
+
 class LRUCache:
+    """
+    有界的LRU缓存，命中时移到队尾，超出`max_size`时淘汰最久未使用的；
+    `max_size`为0表示不缓存
+    """
 
     def __init__(self, max_size: int=256):
-        self.values = {}
-        self.queue = deque()
+        self.values = OrderedDict()
         self.max_size = max_size
-        self.current_size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def current_size(self) -> int:
+        return len(self.values)
+
+    def get(self, key: bytes, record_miss: bool=True):
+        """
+        :param record_miss: 未命中时是否计入misses，为False时由调用方在确认未命中后调用`record_miss`
+        """
+        try:
+            value = self.values[key]
+        except KeyError:
+            if record_miss:
+                self.misses += 1
+            return None
+
+        self.values.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def record_miss(self):
+        self.misses += 1
 
-    def set(self, key: str, route: 'Route'):
-        if self.current_size > self.max_size:
-            key = self.queue.pop()
-            del self.values[key]
-        self.queue.appendleft(key)
-        self.values[key] = route
-        self.current_size += 1
+    def set(self, key: bytes, value):
+        if self.max_size <= 0:
+            return
+
+        self.values[key] = value
+        self.values.move_to_end(key)
+        if len(self.values) > self.max_size:
+            self.values.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self.values.clear()
+
+    def stats(self) -> dict:
+        return {
+            "max_size": self.max_size,
+            "current_size": self.current_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
 
 
 class Router:
-    def __init__(self):
+    def __init__(self, cache_size: int = 10240, not_found_cache_size: int = 1024):
         self.reverse_index = {}
         self.routes = {}
+        # 按注册顺序保存所有路由（包括补齐斜杠的副本），用于生成路由表快照
+        self.route_list = []
         self.dynamic_routes = []
+        self.trie = RouteTrie()
         self.default_handlers = {}
-        self.cache = LRUCache(max_size=1024 * 1024)
+        self.cache = LRUCache(max_size=cache_size)
+        # 单独缓存404的路径，扫描器请求随机url时不会把正常路由挤出缓存
+        self.not_found_cache = LRUCache(max_size=not_found_cache_size)
+
+    def clear_cache(self):
+        self.cache.clear()
+        self.not_found_cache.clear()
+
+    def cache_stats(self) -> dict:
+        return {
+            "routes": self.cache.stats(),
+            "not_found": self.not_found_cache.stats(),
+        }
 
     def _add_route_to_cache(self, route: 'Route'):
         """
@@ -99,14 +367,17 @@ class Router:
         :return:
         """
         if route.is_dynamic:
-            self.dynamic_routes.append(route)
+            if route.segments is None:
+                # 只有原生正则`(?P<..>)`等无法拆段的规则才走正则逐个匹配
+                self.dynamic_routes.append(route)
+            else:
+                self.trie.insert(route.segments, route)
         else:
-            m = hashlib.md5()
-            m.update(route.pattern)
-            cache_key = m.hexdigest()
-            self.routes[cache_key] = route
+            self.routes[route.pattern] = route
 
+        self.route_list.append(route)
         self.reverse_index[route.name] = route
+        self.clear_cache()
 
     def add_route(self, route: 'Route', check_slashes: bool = True):
         self._add_route_to_cache(route)
@@ -130,48 +401,57 @@ class Router:
         if method not in methods:
             raise MethodNotAllowed()
 
-    def _find_route(self, url: bytes, method: bytes) -> 'Route':
-        m = hashlib.md5()
-        m.update(url)
-        cache_key = m.hexdigest()
-        route = self.cache.values.get(cache_key)
-        if route:
+    def _match_dynamic(self, url: bytes) -> RouteMatch or None:
+        for route in self.dynamic_routes:
+            match = route.regex.fullmatch(url)
+            if match is None:
+                continue
+            try:
+                return RouteMatch(route, route.convert_params(match))
+            except ValueError:
+                continue
+        return None
+
+    def _find_route(self, url: bytes, method: bytes) -> RouteMatch:
+        route = self.routes.get(url)
+        if route is not None:
             self.check_allowed_method(route, method)
-            return route
+            return RouteMatch(route)
 
-        try:
-            route = self.routes[cache_key]
-            self.cache.set(cache_key, route)
-            self.check_allowed_method(route, method)
-            return route
-        except KeyError:
-            pass
-        for route in self.dynamic_routes:
-            if route.regex.fullmatch(url):
-                self.cache.set(cache_key, route)
-                self.check_allowed_method(route, method)
-                return route
+        match = self.cache.get(url)
+        if match is None:
+            # 正常路由首次匹配也会查询404缓存，只有最终确实404时才算作404缓存未命中
+            if self.not_found_cache.get(url, record_miss=False) is not None:
+                raise NotFound()
+
+            match = self.trie.match(url) or self._match_dynamic(url)
+            if match is None:
+                self.not_found_cache.record_miss()
+                self.not_found_cache.set(url, True)
+                raise NotFound()
 
-        raise NotFound()
+            self.cache.set(url, match)
 
-    def get_route(self, request: Request or WebSocket) -> 'Route':
+        self.check_allowed_method(match.route, method)
+        return match
+
+    def get_route(self, request: Request or WebSocket) -> RouteMatch:
         try:
-            route = self._find_route(request.url.path, request.method)
-            return route
+            return self._find_route(request.path, request.method)
         except NotFound:
             if isinstance(request, WebSocket):
                 raise NotFound
 
-            return self.default_handlers[404]
+            return RouteMatch(self.default_handlers[404])
         except MethodNotAllowed:
-            return self.default_handlers[405]
+            return RouteMatch(self.default_handlers[405])
         except Exception as e:
             logger.error(f"get route error, url:{request.url} method: {request.method}",
                          exc_info=True)
             request.context['exc'] = e
             if isinstance(request, WebSocket):
                 raise Exception
-            return self.default_handlers[500]
+            return RouteMatch(self.default_handlers[500])
 
     def check_integrity(self):
         for http_code in [404, 405, 500]:
@@ -204,20 +484,65 @@ class Route:
         self.pattern = pattern
         self.is_coroutine = iscoroutinefunction(handler)
         self.methods = clean_methods(methods)
-        self.regex, self.params_book, self.simplified_pattern = PatternParser.extract_params(pattern)
+        self._regex, self.params_book, self.simplified_pattern, self.converters = \
+            PatternParser.extract_params(pattern)
+        self._regex_pattern = self._regex.pattern
         self.has_parameters = bool(self.params_book)
         if dynamic is None:
-            self.is_dynamic = PatternParser.is_dynamic_pattern(self.regex.pattern)
+            self.is_dynamic = PatternParser.is_dynamic_pattern(self._regex_pattern)
         else:
             self.is_dynamic = dynamic
+        self.segments = PatternParser.split_segments(pattern) if self.is_dynamic else None
 
-    def call_handler(self, request: Request):
-        if self.has_parameters:
-            match = self.regex.match(request.url.path)
-            function_params = {name: match.group(name) for name in self.params_book}
-            return self.handler(request, **function_params)
+    @classmethod
+    def restore(cls, state: dict, handler, parent=None, app=None) -> 'Route':
+        """
+        根据路由表快照重建路由，跳过规则解析，正则在第一次使用时才编译
+        :param state: `rest_framework.core.snapshot`生成的路由数据
+        :param handler:
+        :param parent:
+        :param app:
+        :return:
+        """
+        route = cls.__new__(cls)
+        route.name = state["name"]
+        route.handler = handler
+        route.app = app
+        route.parent = parent
+        route.pattern = state["pattern"]
+        route.is_coroutine = iscoroutinefunction(handler)
+        route.methods = state["methods"]
+        route._regex = None
+        route._regex_pattern = state["regex"]
+        route.params_book = state["params_book"]
+        route.simplified_pattern = state["simplified_pattern"]
+        route.converters = state["converters"]
+        route.has_parameters = bool(route.params_book)
+        route.is_dynamic = state["is_dynamic"]
+        route.segments = state["segments"]
+        return route
+
+    @property
+    def regex(self):
+        if self._regex is None:
+            self._regex = re.compile(self._regex_pattern)
+        return self._regex
+
+    def convert_params(self, match) -> dict:
+        """
+        把正则匹配到的参数经转换器转换，不符合转换器格式时抛出ValueError
+        :param match:
+        :return:
+        """
+        params = {}
+        for name in self.params_book:
+            converter = self.converters[name]
+            value = match.group(name)
+            params[name] = value.decode("utf-8") if converter is None else converter.convert(value)
+        return params
 
-        return self.handler(request)
+    def call_handler(self, request: Request, **params):
+        return self.handler(request, **params)
 
     def build_url(self, **kwargs):
         if not self.is_dynamic:
@@ -225,7 +550,9 @@ class Route:
         else:
             url = self.simplified_pattern
             for key, value in kwargs.items():
-                url = url.replace('$' + key, str(value))
+                converter = self.converters.get(key)
+                value = converter.to_url(value) if converter is not None else str(value)
+                url = url.replace(b'$' + key.encode(), value.encode())
             return url
 
     def __eq__(self, other):
@@ -5,6 +5,7 @@
 from rest_framework.core.script.base import Manager
 from rest_framework.core.script.db import MigrateCommand
 from rest_framework.core.script.secretkey import SecretKeyCommand
+from rest_framework.core.script.routes import RouteCommand
 from rest_framework.core.script.cli import prompt, prompt_pass, prompt_bool, prompt_choices
 
 __all__ = [
@@ -29,4 +30,5 @@ def execute_from_command_line(commands=None):
 
 
 manager.add_command('secretkey', SecretKeyCommand)
-manager.add_command('db', MigrateCommand)
\ No newline at end of file
+manager.add_command('db', MigrateCommand)
+manager.add_command('routes', RouteCommand)
\ No newline at end of file
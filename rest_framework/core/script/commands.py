@@ -3,8 +3,8 @@ import re
 import inspect
 import argparse
 import asyncio
-from rest_framework.core import singnals
 from rest_framework.core.application import get_application
+from rest_framework.core.prefork import Arbiter
 
 PATTERN = re.compile('^[a-zA-Z]+[a-zA-Z_]*[a-zA-Z]$')
 
@@ -217,12 +217,85 @@ class Server(Command):
                    type=int,
                    help="Application port, the default is 5000",
                    default=5000),
-
+            Option('-w', '--workers',
+                   dest='workers',
+                   type=int,
+                   help="Number of worker processes, the default is 1 (single process)",
+                   default=1),
+            Option('--max-requests',
+                   dest='max_requests',
+                   type=int,
+                   help="Restart a worker after it has handled this many requests, 0 means never",
+                   default=0),
+            Option('--max-requests-jitter',
+                   dest='max_requests_jitter',
+                   type=int,
+                   help="Add a random 0..N to --max-requests for each worker",
+                   default=0),
+            Option('--reuse-port',
+                   dest='reuse_port',
+                   action="store_true",
+                   help="Bind a SO_REUSEPORT socket in each worker instead of sharing one socket",
+                   default=False),
+            Option('--graceful-timeout',
+                   dest='graceful_timeout',
+                   type=int,
+                   help="Seconds to wait for a worker to finish its requests when stopping",
+                   default=30),
+            Option('--loop',
+                   dest='loop',
+                   choices=("auto", "asyncio", "uvloop"),
+                   help="Event loop implementation, auto uses uvloop when installed",
+                   default="auto"),
+            Option('--http',
+                   dest='http',
+                   choices=("auto", "h11", "httptools"),
+                   help="HTTP parser implementation, auto uses httptools when installed",
+                   default="auto"),
+            Option('--backlog',
+                   dest='backlog',
+                   type=int,
+                   help="Maximum number of pending connections in the listen queue",
+                   default=2048),
+            Option('--keep-alive',
+                   dest='keep_alive',
+                   type=int,
+                   help="Seconds to keep an idle keep-alive connection open",
+                   default=5),
+            Option('--limit-concurrency',
+                   dest='limit_concurrency',
+                   type=int,
+                   help="Maximum concurrent connections or tasks per process before responding 503",
+                   default=None),
+            Option('--no-access-log',
+                   dest='access_log',
+                   action="store_false",
+                   help="Disable the access log",
+                   default=True),
         )
 
         return options
 
-    def run(self, app, host, port, **kwargs):
+    def run(self, app, host, port, workers=1, max_requests=0, max_requests_jitter=0,
+            reuse_port=False, graceful_timeout=30, loop="auto", http="auto", backlog=2048,
+            keep_alive=5, limit_concurrency=None, access_log=True, **kwargs):
+        server_options = {
+            "loop": loop,
+            "http": http,
+            "backlog": backlog,
+            "timeout_keep_alive": keep_alive,
+            "limit_concurrency": limit_concurrency,
+            "access_log": access_log,
+        }
+        # app_started在lifespan startup中、事件循环启动后发送
         app = get_application()
-        singnals.app_started.send(self)
-        app.run(host=host, port=port)
+        if workers > 1 or max_requests:
+            # 多进程模式：应用已在master中加载，worker通过fork共享
+            arbiter = Arbiter(
+                app, host=host, port=port, workers=workers, max_requests=max_requests,
+                max_requests_jitter=max_requests_jitter, reuse_port=reuse_port,
+                graceful_timeout=graceful_timeout, **server_options
+            )
+            arbiter.run()
+        else:
+            app.run(host=host, port=port, **server_options)
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+"""
+路由表相关命令
+"""
+from rest_framework.conf import settings
+from rest_framework.core import snapshot as route_snapshot
+from rest_framework.core.application import Application
+from rest_framework.core.script.base import Manager
+from rest_framework.core.script.exceptions import CommandError
+
+
+RouteCommand = Manager(usage="Route table commands")
+
+
+@RouteCommand.option(
+    '-o', '--output',
+    dest='output', default=None,
+    help="Snapshot file path, the default is settings.ROUTE_SNAPSHOT"
+)
+def snapshot(app, output=None):
+    """
+    Compile the route table into a snapshot file
+    """
+    output = output or settings.ROUTE_SNAPSHOT
+    if not output:
+        raise CommandError("Please set ROUTE_SNAPSHOT or pass --output")
+
+    application = Application(use_route_snapshot=False)
+    count = route_snapshot.dump_routes(application.router, output, settings.ROOT_URLCONF)
+    print("Route snapshot:", output, "routes:", count)
@@ -1,12 +1,11 @@
 # -*- coding: utf-8 -*-
-from rest_framework.utils.escape import json_encode
+from rest_framework.utils.escape import json_encode_bytes
 from rest_framework.utils.escape import json_decode
-from rest_framework.utils.transcoder import force_bytes
 
 
 class Handler:
     def dumps(self, value):
-        return force_bytes(json_encode(value))
+        return json_encode_bytes(value)
 
     def loads(self, value):
         return json_decode(value)
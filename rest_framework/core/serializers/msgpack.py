@@ -1,10 +1,64 @@
 # -*- coding: utf-8 -*-
+import datetime
+import struct
+from decimal import Decimal
+from uuid import UUID
+
 import msgpack
 
+from rest_framework.core.translation import LazyString
+
+# 扩展类型编号
+EXT_DATETIME = 1
+EXT_DECIMAL = 2
+# msgpack规范定义的Timestamp类型，只用于解码其他语言客户端发送的时间
+EXT_TIMESTAMP = -1
+
+
+def default(o):
+    """
+    datetime编码为[年, 月, 日, 时, 分, 秒, 微秒, UTC偏移秒数或None]，Decimal编码为字符串，保留精度
+    """
+    if isinstance(o, datetime.datetime):
+        offset = o.utcoffset()
+        data = msgpack.packb([
+            o.year, o.month, o.day, o.hour, o.minute, o.second, o.microsecond,
+            None if offset is None else int(offset.total_seconds())
+        ])
+        return msgpack.ExtType(EXT_DATETIME, data)
+    if isinstance(o, Decimal):
+        return msgpack.ExtType(EXT_DECIMAL, str(o).encode("ascii"))
+    if isinstance(o, (datetime.date, datetime.time)):
+        return o.isoformat()
+    if isinstance(o, (UUID, LazyString)):
+        return str(o)
+    raise TypeError("%r is not msgpack serializable" % o)
+
+
+def ext_hook(code, data):
+    if code == EXT_DATETIME:
+        fields = msgpack.unpackb(data)
+        offset = fields.pop()
+        tz = None if offset is None else datetime.timezone(datetime.timedelta(seconds=offset))
+        return datetime.datetime(*fields, tzinfo=tz)
+    if code == EXT_DECIMAL:
+        return Decimal(data.decode("ascii"))
+    if code == EXT_TIMESTAMP:
+        if len(data) == 4:
+            seconds, nanoseconds = struct.unpack(">I", data)[0], 0
+        elif len(data) == 8:
+            value = struct.unpack(">Q", data)[0]
+            seconds, nanoseconds = value & 0x00000003ffffffff, value >> 34
+        else:
+            nanoseconds, seconds = struct.unpack(">Iq", data)
+        epoch = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+        return epoch + datetime.timedelta(seconds=seconds, microseconds=nanoseconds // 1000)
+    return msgpack.ExtType(code, data)
+
 
 class Handler:
     def dumps(self, value):
-        return msgpack.dumps(value)
+        return msgpack.packb(value, default=default, use_bin_type=True)
 
     def loads(self, value):
-        return msgpack.loads(value, encoding="utf-8")
+        return msgpack.unpackb(value, raw=False, ext_hook=ext_hook, strict_map_key=False)
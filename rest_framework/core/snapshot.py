@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+路由表快照
+把编译好的路由表（规则、参数、请求方法、handler导入路径）序列化到文件，
+worker启动时直接加载，不再执行urlconf和解析路由规则；
+urlconf或handler所在模块修改后快照自动失效
+"""
+import os
+import sys
+import pickle
+import logging
+from importlib import import_module
+
+from rest_framework.core.router import Route, PatternParser
+
+SNAPSHOT_VERSION = 1
+logger = logging.getLogger(__name__)
+
+
+def _load_handler(module_name, qualname):
+    obj = import_module(module_name)
+    for attr in qualname.split("."):
+        obj = getattr(obj, attr)
+    return obj
+
+
+def _module_file(module):
+    path = getattr(module, "__file__", None)
+    return os.path.abspath(path) if path else None
+
+
+def _collect_sources(urlconf, handler_modules):
+    """
+    收集需要检查修改时间的源文件：所有urlconf模块及handler所在模块
+    :param urlconf:
+    :param handler_modules:
+    :return: {文件路径: 修改时间}
+    """
+    modules = {urlconf} | set(handler_modules)
+    for name, module in list(sys.modules.items()):
+        if "urlpatterns" in getattr(module, "__dict__", {}):
+            modules.add(name)
+
+    sources = {}
+    for name in modules:
+        path = _module_file(sys.modules.get(name))
+        if path and os.path.exists(path):
+            sources[path] = os.stat(path).st_mtime
+    return sources
+
+
+def _is_fresh(snapshot, urlconf):
+    if snapshot.get("version") != SNAPSHOT_VERSION or snapshot.get("urlconf") != urlconf:
+        return False
+
+    for path, mtime in snapshot["sources"].items():
+        try:
+            if os.stat(path).st_mtime != mtime:
+                return False
+        except OSError:
+            return False
+    return True
+
+
+def dump_routes(router, path, urlconf):
+    """
+    把路由表写入快照文件
+    :param router: 已注册好路由的Router
+    :param path: 快照文件路径
+    :param urlconf: settings.ROOT_URLCONF
+    :return: 写入的路由个数
+    """
+    converter_names = {id(c): name for name, c in PatternParser.CONVERTERS.items()}
+
+    def dump_converter(converter):
+        return None if converter is None else converter_names[id(converter)]
+
+    views = []
+    view_indexes = {}
+    routes = []
+    for route in router.route_list:
+        view = route.handler
+        if id(view) not in view_indexes:
+            view_class = view.view_class
+            view_indexes[id(view)] = len(views)
+            views.append({
+                "module": view_class.__module__,
+                "qualname": view_class.__qualname__,
+                "name": view.__name__,
+                "kwargs": view.view_initkwargs,
+            })
+
+        segments = route.segments
+        if segments is not None:
+            segments = [s if isinstance(s, bytes) else dump_converter(s) for s in segments]
+
+        routes.append({
+            "view": view_indexes[id(view)],
+            "name": route.name,
+            "pattern": route.pattern,
+            "methods": route.methods,
+            "regex": route._regex_pattern,
+            "params_book": route.params_book,
+            "simplified_pattern": route.simplified_pattern,
+            "converters": {k: dump_converter(v) for k, v in route.converters.items()},
+            "is_dynamic": route.is_dynamic,
+            "segments": segments,
+        })
+
+    snapshot = {
+        "version": SNAPSHOT_VERSION,
+        "urlconf": urlconf,
+        "sources": _collect_sources(urlconf, {v["module"] for v in views}),
+        "views": views,
+        "routes": routes,
+    }
+
+    temp_path = "%s.%d.tmp" % (path, os.getpid())
+    with open(temp_path, "wb") as f:
+        pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, path)
+    return len(routes)
+
+
+def load_routes(application, path, urlconf):
+    """
+    从快照文件恢复路由表到application.router
+    快照不存在、版本不符或源文件已修改时返回False，由调用方重新编译路由
+    :param application:
+    :param path:
+    :param urlconf:
+    :return: bool
+    """
+    try:
+        with open(path, "rb") as f:
+            snapshot = pickle.load(f)
+    except FileNotFoundError:
+        return False
+    except Exception:
+        logger.warning(f"route snapshot `{path}` is unreadable, recompiling routes", exc_info=True)
+        return False
+
+    if not _is_fresh(snapshot, urlconf):
+        logger.info(f"route snapshot `{path}` is stale, recompiling routes")
+        return False
+
+    converters = PatternParser.CONVERTERS
+
+    def load_converter(name):
+        return None if name is None else converters[name]
+
+    views = []
+    for view in snapshot["views"]:
+        handler = _load_handler(view["module"], view["qualname"])
+        views.append(handler.as_view(name=view["name"], application=application, **view["kwargs"]))
+
+    router = application.router
+    for state in snapshot["routes"]:
+        state["converters"] = {k: load_converter(v) for k, v in state["converters"].items()}
+        if state["segments"] is not None:
+            state["segments"] = [
+                s if isinstance(s, bytes) else load_converter(s) for s in state["segments"]
+            ]
+        route = Route.restore(state, views[state["view"]], parent=application)
+        router.add_route(route, check_slashes=False)
+
+    return True
@@ -8,7 +8,6 @@ from rest_framework.conf import settings
 
 logger = logging.getLogger(__name__)
 _translations = {}
-_caches = {}
 _locale_caches = {}
 
 
@@ -26,15 +25,6 @@ class LazyString:
             return getattr(string, attr)
         raise AttributeError(attr)
 
-    def __json__(self):
-        global _caches
-        k = hash((babel.locale, self._string))
-        v = _caches.get(k, None)
-        if v is None:
-            v = '"%s"' % str(self)
-            _caches[k] = v
-        return v
-
     def __repr__(self):
         return "l'{0}'".format(str(self))
 
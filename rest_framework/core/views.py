@@ -3,11 +3,17 @@ import logging
 import traceback
 import asyncio
 
+from rest_framework.conf import settings
 from rest_framework.core import codecs
-from rest_framework.core.response import Response
+from rest_framework.core import deadline
+from rest_framework.core.background import BackgroundTask
+from rest_framework.core.compression import compress_response
+from rest_framework.core.response_cache import X_CACHE
+from rest_framework.core.response import Response, StreamingResponse, FileResponse
 from rest_framework.core.websockets import WebSocket
 from rest_framework.utils import status
-from rest_framework.core.request import Request
+from rest_framework.core.request import Request, ClientDisconnect
+from rest_framework.core.datastructures import ACCEPT, CONTENT_TYPE, add_vary
 from rest_framework.core.translation import lazy_translate as _
 from rest_framework.core.exceptions import APIException, HTTPError
 from rest_framework.utils.escape import json_decode
@@ -30,19 +36,57 @@ class HandlerMethodType(type):
         return rv
 
 
+class DispatchPlan:
+    """
+    handler类的分发计划，每个类只生成一次，处理请求时不再反射查找方法、导入类
+    """
+
+    def __init__(self, handlers=None, parsers=None):
+        # 请求方法（大写bytes）到未绑定方法的映射
+        self.handlers = handlers or {}
+        self.allowed_methods = frozenset(self.handlers)
+        # 媒体类型到解析器的映射
+        self.parsers = parsers or {}
+        # 响应缓存（ResponseCache），None表示不缓存
+        self.response_cache = None
+
+
 class BaseRequestHandler:
     methods = None
 
     def dispatch_request(self):
         raise NotImplementedError()
 
+    @classmethod
+    def build_dispatch_plan(cls):
+        """
+        生成分发计划，子类可扩展需要预先解析的内容
+        """
+        return DispatchPlan()
+
+    @classmethod
+    def get_dispatch_plan(cls):
+        """
+        本类的分发计划，首次调用时生成；生成后再修改类的方法或属性不会生效
+        """
+        try:
+            return cls.__dict__["_dispatch_plan"]
+        except KeyError:
+            plan = cls.build_dispatch_plan()
+            cls._dispatch_plan = plan
+            return plan
+
     @classmethod
     def as_view(cls, name, application, **class_kwargs):
+        # 在加载路由时生成分发计划，导入失败等错误在启动时即可发现
+        cls.get_dispatch_plan()
+
         async def view(request: Request or WebSocket, *args, **kwargs):
             self = view.view_class(application, request, **class_kwargs)
             return await self.dispatch_request(*args, **kwargs)
 
         view.view_class = cls
+        view.view_initkwargs = class_kwargs
         view.__name__ = name
         view.__doc__ = cls.__doc__
         view.__module__ = cls.__module__
@@ -52,6 +96,12 @@ class BaseRequestHandler:
 
 
 class RequestHandler(BaseRequestHandler, metaclass=HandlerMethodType):
+    # 是否压缩响应，None表示使用`settings.RESPONSE_COMPRESSION`
+    compress_response = None
+    # 处理超时秒数，None表示使用`settings.REQUEST_TIMEOUT`，0表示不限制
+    request_timeout = None
+    # 客户端断开连接时是否取消处理，None表示使用`settings.CANCEL_ON_DISCONNECT`
+    cancel_on_disconnect = None
 
     def __init__(self, application, request, **kwargs):
         self.application = application
@@ -68,16 +118,31 @@ class RequestHandler(BaseRequestHandler, metaclass=HandlerMethodType):
         query_arguments = self.request.query_params
         return {k: v for k, v in query_arguments if v}
 
-    @staticmethod
-    def __select_parser(content_type):
-        for parser in codecs.PARSER_MEDIA_TYPE:
-            if parser.media_type in content_type:
+    @classmethod
+    def build_dispatch_plan(cls):
+        handlers = {}
+        for method in SUPPORTED_METHODS:
+            func = getattr(cls, method, None)
+            if func is not None:
+                handlers[method.upper().encode()] = func
+        parsers = {parser.media_type: parser for parser in codecs.PARSER_MEDIA_TYPE}
+        return DispatchPlan(handlers, parsers)
+
+    def __select_parser(self, content_type):
+        parsers = self.get_dispatch_plan().parsers
+        parser = parsers.get(content_type.split(";", 1)[0].strip())
+        if parser is not None:
+            return parser
+
+        # 兼容包含已支持媒体类型的Content-Type，如"application/json-patch+json"
+        for media_type, parser in parsers.items():
+            if media_type in content_type:
                 return parser
         return None
 
     async def prepare(self):
         method = self.request.method.lower()
-        content_type = self.request.headers.get("Content-Type", "").lower()
+        content_type = self.request.headers.get(CONTENT_TYPE, "").lower()
         self.request_data = self._parse_query_arguments()
         if not content_type or method == b"get":
             if self.path_kwargs:
@@ -110,18 +175,42 @@ class RequestHandler(BaseRequestHandler, metaclass=HandlerMethodType):
         return response
 
     async def dispatch_request(self, *args, **kwargs):
-        method = self.request.method.lower().decode("utf8")
         self.path_args = args
         self.path_kwargs = kwargs
-        handler = getattr(self, method, None)
+        plan = self.get_dispatch_plan()
+        func = plan.handlers.get(self.request.method)
+        timeout = None
         try:
+            timeout = self.get_request_timeout()
+            if timeout is not None:
+                deadline.set_deadline(timeout)
             await self.prepare()
-            result = await handler(*args, **kwargs)
+            if func is None:
+                raise HTTPError(status.HTTP_405_METHOD_NOT_ALLOWED)
+
+            # 在prepare之后查找缓存，命中时仍经过handler在prepare中的按请求检查
+            response_cache = plan.response_cache
+            cache_key = None
+            if response_cache is not None:
+                cache_key = response_cache.make_key(self.request)
+                if cache_key is not None:
+                    cached = await response_cache.load(self.request, cache_key)
+                    if cached is not None:
+                        return self.compress(cached)
+
+            handler = func.__get__(self, type(self))
+            result = await self.run_handler(handler, timeout, *args, **kwargs)
             response = self.finalize_response(result)
             if asyncio.iscoroutine(response):
                 response = await response
-            return response
-
+            response = self.negotiate(response)
+            if cache_key is not None:
+                self.store_response(response_cache, cache_key, response)
+            return self.compress(response)
+
+        except ClientDisconnect:
+            code = status.HTTP_499_CLIENT_CLOSED_REQUEST
+            return self.write_error({"message": code.description, "code": code.phrase}, code)
         except Exception as e:
             try:
                 return self._handle_request_exception(e)
@@ -132,6 +221,102 @@ class RequestHandler(BaseRequestHandler, metaclass=HandlerMethodType):
                     "code": "Error"
                 }
                 return self.write_error(error_content, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        finally:
+            # 截止时间只限制handler，StreamingResponse的响应体在返回之后才生成，不能在发出200之后再超时
+            if timeout is not None:
+                deadline.set_deadline(None)
+
+    def store_response(self, response_cache, cache_key, response):
+        """
+        在压缩之前保存可缓存的响应，写入缓存交给后台任务，不增加本次请求的耗时
+        """
+        if not response_cache.is_cacheable(response):
+            return
+        value = response_cache.dumps(response)
+        response.headers[X_CACHE] = "MISS"
+
+        runner = getattr(self.application, "background", None)
+        if runner is None:
+            asyncio.ensure_future(response_cache.store(cache_key, value))
+        else:
+            runner.submit(BackgroundTask(response_cache.store, cache_key, value))
+
+    def get_request_timeout(self):
+        """
+        本次请求的处理超时秒数：handler的`request_timeout`或`settings.REQUEST_TIMEOUT`，
+        配置了`settings.REQUEST_TIMEOUT_HEADER`时客户端可通过该请求头缩短
+        :return: 秒数，None表示不限制
+        """
+        timeout = self.request_timeout
+        if timeout is None:
+            timeout = settings.REQUEST_TIMEOUT
+
+        header = settings.REQUEST_TIMEOUT_HEADER
+        if header:
+            try:
+                value = float(self.request.headers.get(header, 0))
+            except ValueError:
+                value = 0
+            if value > 0:
+                timeout = min(timeout, value) if timeout else value
+
+        return timeout or None
+
+    async def run_handler(self, handler, timeout, *args, **kwargs):
+        """
+        执行请求方法，超时或客户端断开（请求体已读取完时才能检测）时取消
+        """
+        cancel_on_disconnect = self.cancel_on_disconnect
+        if cancel_on_disconnect is None:
+            cancel_on_disconnect = settings.CANCEL_ON_DISCONNECT
+        if cancel_on_disconnect and self.request.has_unread_body():
+            cancel_on_disconnect = False
+
+        if timeout is None and not cancel_on_disconnect:
+            return await handler(*args, **kwargs)
+
+        disconnect = self.request.wait_disconnect() if cancel_on_disconnect else None
+        return await deadline.run(handler(*args, **kwargs), disconnect)
+
+    def get_response_media_type(self):
+        """
+        按请求头Accept选择响应格式（application/json或application/msgpack）
+        """
+        return codecs.negotiate_media_type(self.request.headers.get(ACCEPT))
+
+    def negotiate(self, response):
+        """
+        直接返回JSON Response的handler，按Accept重新渲染为msgpack
+        """
+        if codecs.msgpack_handler is None or not isinstance(response, Response) \
+                or isinstance(response, (StreamingResponse, FileResponse)):
+            return response
+        if response.content_type != codecs.JSON_MEDIA_TYPE \
+                and response.content_type not in codecs.MSGPACK_MEDIA_TYPES:
+            return response
+
+        add_vary(response.headers, "Accept")
+        if response.content_type == codecs.JSON_MEDIA_TYPE:
+            media_type = self.get_response_media_type()
+            if media_type != response.content_type:
+                response.set_content_type(media_type)
+        return response
+
+    def compress(self, response):
+        """
+        按Accept-Encoding压缩响应
+        """
+        enabled = self.compress_response
+        if enabled is None:
+            enabled = settings.RESPONSE_COMPRESSION
+        if not enabled or not isinstance(response, Response):
+            return response
+        if response.status_code == status.HTTP_304_NOT_MODIFIED:
+            # 304没有响应体不压缩，但对应的200响应带有Vary: Accept-Encoding，须一并带上
+            add_vary(response.headers, "Accept-Encoding")
+            return response
+
+        return compress_response(self.request, response)
 
     def _handle_request_exception(self, e):
         logger.error(f"request `{self.request.url}` exception", exc_info=True)
@@ -144,6 +329,9 @@ class RequestHandler(BaseRequestHandler, metaclass=HandlerMethodType):
                 "code": "Error"
             }
             return self.write_error(error_content, status_code)
+        elif isinstance(e, APIException):
+            error_content = {"message": e.detail, "code": e.code}
+            return self.write_error(error_content, e.status_code)
         else:
             error_content = {
                 "message": traceback.format_exc(),
@@ -3,8 +3,8 @@ import typing
 
 from collections.abc import Mapping
 from rest_framework.core.types import Scope, Receive, Send, Message
-from rest_framework.utils.escape import json_decode, json_encode
-from rest_framework.core.datastructures import URL, Headers, QueryParams
+from rest_framework.utils.escape import json_decode, json_encode_bytes
+from rest_framework.core.datastructures import URL, Headers, QueryParams, get_route_path
 
 
 class WebSocketState(enum.Enum):
@@ -19,6 +19,11 @@ class WebSocketDisconnect(Exception):
 
 
 class WebSocket(Mapping):
+    __slots__ = (
+        "_scope", "_receive", "_send", "context", "client_state", "application_state",
+        "_path", "_url", "_headers", "_query_params",
+    )
+
     def __init__(self, scope: Scope, receive: Receive, send: Send) -> None:
         assert scope["type"] == "websocket"
         self._scope = scope
@@ -27,6 +32,10 @@ class WebSocket(Mapping):
         self.context = {}
         self.client_state = WebSocketState.CONNECTING
         self.application_state = WebSocketState.CONNECTING
+        self._path = None
+        self._url = None
+        self._headers = None
+        self._query_params = None
 
     def __getitem__(self, key: str) -> str:
         return self._scope[key]
@@ -41,25 +50,31 @@ class WebSocket(Mapping):
     def method(self) -> bytes:
         return b"GET"
 
+    @property
+    def path(self) -> bytes:
+        if self._path is None:
+            self._path = get_route_path(self._scope)
+
+        return self._path
+
     @property
     def url(self) -> URL:
-        if not hasattr(self, "_url"):
-            setattr(self, "_url", URL(scope=self._scope))
+        if self._url is None:
+            self._url = URL(scope=self._scope)
 
         return self._url
 
     @property
     def headers(self) -> Headers:
-        if not hasattr(self, "_headers"):
-            setattr(self, "_headers", Headers(self._scope["headers"]))
+        if self._headers is None:
+            self._headers = Headers(self._scope["headers"])
 
         return self._headers
 
     @property
     def query_params(self) -> QueryParams:
-        if not hasattr(self, "_query_params"):
-            query_string = self._scope["query_string"].decode()
-            setattr(self, "_query_params", QueryParams(query_string))
+        if self._query_params is None:
+            self._query_params = QueryParams(self._scope["query_string"].decode())
 
         return self._query_params
 
@@ -136,7 +151,7 @@ class WebSocket(Mapping):
         await self.send({"type": "websocket.send", "bytes": data})
 
     async def send_json(self, data: typing.Any) -> None:
-        send_data = json_encode(data).encode("utf-8")
+        send_data = json_encode_bytes(data)
         await self.send({"type": "websocket.send", "bytes": send_data})
 
     async def close(self, code: int = 1000) -> None:
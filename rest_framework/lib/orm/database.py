@@ -14,6 +14,8 @@ from .peewee import SQL, R, Clause, fn, binary_construct
 from .peewee import logger
 
 from .context import Atomic, Transaction, SavePoint
+from rest_framework.core import deadline
+from rest_framework.core.exceptions import DeadlineExceeded
 from rest_framework.lib.orm.result import AsyncModelQueryResultWrapper
 from rest_framework.lib.orm.result import AsyncTuplesQueryResultWrapper
 from rest_framework.lib.orm.result import AsyncDictQueryResultWrapper
@@ -21,6 +23,10 @@ from rest_framework.lib.orm.result import AsyncNaiveQueryResultWrapper
 from rest_framework.lib.orm.result import AsyncAggregateQueryResultWrapper
 
 
+def is_select(sql):
+    return sql.lstrip()[:6].upper() == "SELECT"
+
+
 class AsyncConnection:
 
     def __init__(self, db, exception_wrapper, autocommit=None, autorollback=None):
@@ -42,21 +48,47 @@ class AsyncConnection:
     def pop_transaction(self):
         return self.transactions.pop()
 
-    async def execute_sql(self, sql, params=None, require_commit=True):
+    async def execute_sql(self, sql, params=None, require_commit=True, cursor_class=None):
+        # 请求设置了截止时间时：已过期不再执行，SELECT带上服务端执行时间限制
+        remaining = deadline.remaining()
+        if remaining is not None:
+            if remaining <= 0:
+                raise DeadlineExceeded()
+            sql = self.db.apply_query_timeout(sql, remaining)
+
         logger.debug((sql, params))
         with self.exception_wrapper:
-            cursor = await self.conn.cursor()
+            cursor = await (self.conn.cursor() if cursor_class is None else self.conn.cursor(cursor_class))
             try:
                 await cursor.execute(sql, params or ())
-            except Exception:
+            except asyncio.CancelledError:
+                self.abort_query(sql)
+                raise
+            except Exception as e:
                 if self.autorollback and self.autocommit:
                     await self.rollback()
+                if remaining is not None and self.db.is_query_timeout(e):
+                    raise DeadlineExceeded() from e
                 raise
             else:
                 if require_commit and self.autocommit:
                     await self.commit()
             return cursor
 
+    def abort_query(self, sql):
+        """
+        查询被取消（请求超时或客户端断开）：连接上可能还有未读取的结果，关闭连接不再放回连接池；
+        SELECT仍在服务端执行，另取连接发送KILL QUERY
+        """
+        conn = self.conn
+        if conn is None or conn.closed:
+            return
+
+        thread_id = conn.thread_id()
+        conn.close()
+        if is_select(sql):
+            asyncio.ensure_future(self.db.kill_query(thread_id))
+
     async def __aenter__(self):
         if self.acquirer is None:
             await self.db.connect()
@@ -90,6 +122,9 @@ class AsyncConnection:
 
 
 class AsyncDatabase(Database):
+    # 服务端游标类，逐行从服务端读取结果，None表示不支持
+    server_side_cursor_class = None
+
     def _connect(self, database, **kwargs):
         raise NotImplementedError
 
@@ -199,6 +234,26 @@ class AsyncDatabase(Database):
 
             await asyncio.sleep(60)
 
+    def apply_query_timeout(self, sql, timeout):
+        """
+        给SQL加上服务端执行时间限制，由具体数据库实现
+        :param sql:
+        :param timeout: 剩余秒数
+        """
+        return sql
+
+    def is_query_timeout(self, exc):
+        """
+        异常是否为超过服务端执行时间限制
+        """
+        return False
+
+    async def kill_query(self, thread_id):
+        """
+        终止服务端正在执行的查询，由具体数据库实现
+        """
+        pass
+
     def get_result_wrapper(self, wrapper_type):
         if wrapper_type == RESULTS_NAIVE:
             return AsyncNaiveQueryResultWrapper
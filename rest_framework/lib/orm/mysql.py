@@ -1,3 +1,5 @@
+import asyncio
+
 try:
     import aiomysql
 except ImportError:
@@ -11,10 +13,18 @@ from .peewee import (
     ForeignKeyMetadata
 )
 
-from .database import AsyncDatabase
+from .database import AsyncDatabase, is_select, logger
+
+# 查询超过MAX_EXECUTION_TIME被服务端中断的错误码
+ER_QUERY_TIMEOUT = 3024
+# 发送KILL QUERY的连接及执行的最长秒数
+KILL_QUERY_TIMEOUT = 2
+# 只用于连接池、单独建立连接时不需要的参数
+POOL_KWARGS = ('minsize', 'maxsize', 'pool_recycle')
 
 
 class AsyncMySQLDatabase(AsyncDatabase, MySQLDatabase):
+    server_side_cursor_class = aiomysql.SSCursor if aiomysql else None
 
     async def _connect(self, database, **kwargs):
         if not aiomysql:
@@ -26,6 +36,32 @@ class AsyncMySQLDatabase(AsyncDatabase, MySQLDatabase):
         conn_kwargs.update(kwargs)
         return await aiomysql.create_pool(db=database, **conn_kwargs)
 
+    def apply_query_timeout(self, sql, timeout):
+        # MySQL 5.7.8+只对SELECT生效，MariaDB会当作注释忽略
+        if not is_select(sql):
+            return sql
+        sql = sql.lstrip()
+        return "%s /*+ MAX_EXECUTION_TIME(%d) */%s" % (sql[:6], max(1, int(timeout * 1000)), sql[6:])
+
+    def is_query_timeout(self, exc):
+        return bool(exc.args) and exc.args[0] == ER_QUERY_TIMEOUT
+
+    async def kill_query(self, thread_id):
+        # 超时较多时连接池可能已被占满，单独建立连接发送，不经过连接池
+        kwargs = {k: v for k, v in self.connect_kwargs.items() if k not in POOL_KWARGS}
+        kwargs.setdefault('charset', 'utf8')
+        kwargs['connect_timeout'] = KILL_QUERY_TIMEOUT
+        kwargs['autocommit'] = True
+        try:
+            conn = await asyncio.wait_for(aiomysql.connect(db=self.database, **kwargs), KILL_QUERY_TIMEOUT)
+            try:
+                async with conn.cursor() as cursor:
+                    await asyncio.wait_for(cursor.execute("KILL QUERY %d" % thread_id), KILL_QUERY_TIMEOUT)
+            finally:
+                conn.close()
+        except Exception:
+            logger.warning("kill query %d failed", thread_id, exc_info=True)
+
     async def get_tables(self, schema=None):
         async with self.get_conn() as conn:
             cursor = await conn.execute_sql('SHOW TABLES')
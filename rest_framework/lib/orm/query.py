@@ -137,6 +137,29 @@ class AsyncSelectQuery(AsyncQuery, SelectQuery):
         async for row in qr.iterator():
             yield row
 
+    async def stream(self):
+        """
+        使用服务端游标逐行读取，驱动不会把整个结果集读入内存；读取完或中途停止前一直占用数据库连接，
+        中途停止时关闭连接，不再读取剩余的结果。数据库不支持服务端游标时同iterator()
+        """
+        cursor_class = self.database.server_side_cursor_class
+        if cursor_class is None:
+            async for row in self.iterator():
+                yield row
+            return
+
+        sql, params = self.sql()
+        async with self.database.get_conn() as conn:
+            cursor = await conn.execute_sql(sql, params, self.require_commit, cursor_class=cursor_class)
+            qr = self._get_result_wrapper()(self.model_class, cursor, self.get_query_meta())
+            try:
+                async for row in qr.iterator():
+                    yield row
+            except BaseException:
+                conn.abort_query(sql)
+                raise
+            await cursor.close()
+
     def __getitem__(self, value):
         raise NotImplementedError()
 
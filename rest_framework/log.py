@@ -1,10 +1,14 @@
 # -*- coding: utf-8 -*-
 import os
 import re
+import copy
 import time
+import queue
+import atexit
 import logging
+import threading
 from logging.config import dictConfig
-from logging.handlers import TimedRotatingFileHandler
+from logging.handlers import QueueHandler, BaseRotatingHandler, TimedRotatingFileHandler
 
 app_logger = logging.getLogger("rest_framework.server")
 
@@ -41,11 +45,416 @@ DEFAULT_LOGGING = {
 }
 
 
-def configure_logging(logging_settings):
+# 可以在后台线程中合并写入、每批只flush一次的emit实现，重写了emit的handler逐条处理
+BATCHED_EMITS = (logging.StreamHandler.emit, logging.FileHandler.emit, BaseRotatingHandler.emit)
+_STOP = object()
+_pipeline = None
+_dedup_flusher = None
+# 检查并输出去重窗口已结束的被抑制日志条数的间隔秒数
+SUPPRESSED_FLUSH_INTERVAL = 1
+
+
+def write_records(handler, records):
+    """
+    把一批日志写入handler，文件滚动也在调用线程中完成
+    """
+    if type(handler).emit not in BATCHED_EMITS:
+        for record in records:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+        return
+
+    handler.acquire()
+    try:
+        for record in records:
+            if record.levelno < handler.level or not handler.filter(record):
+                continue
+            try:
+                if isinstance(handler, BaseRotatingHandler) and handler.shouldRollover(record):
+                    handler.doRollover()
+                if handler.stream is None:
+                    handler.stream = handler._open()
+                handler.stream.write(handler.format(record) + handler.terminator)
+            except Exception:
+                handler.handleError(record)
+        handler.flush()
+    finally:
+        handler.release()
+
+
+class LogQueueHandler(QueueHandler):
+    """
+    替换logger原有的handler，日志放入队列后立即返回，由后台线程写入原有的handler；
+    队列已满时丢弃并计数
+    """
+
+    def __init__(self, pipeline, logger_name, targets):
+        super().__init__(pipeline.queue)
+        self.pipeline = pipeline
+        self.logger_name = logger_name
+        self.targets = tuple(targets)
+        self.dropped = 0
+        self.reported = 0
+        self.setLevel(min(handler.level for handler in self.targets))
+
+    def prepare(self, record):
+        # 参数在当前线程合并到消息中，异常堆栈留给后台线程按各handler的formatter格式化
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.pipeline.queue.put_nowait((self, record))
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogPipeline:
+    """
+    日志队列及写入日志的后台线程
+    """
+
+    def __init__(self, queue_size=10000, batch_size=100):
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.queue = queue.Queue(queue_size)
+        self.queue_handlers = []
+        self.processed = 0
+        self.suppressed_flushed = 0
+        self.thread = None
+
+    def wrap_logger(self, logger):
+        """
+        把logger原有的handler移到后台线程
+        """
+        targets = [handler for handler in logger.handlers if not isinstance(handler, LogQueueHandler)]
+        if not targets:
+            return
+        handler = LogQueueHandler(self, logger.name, targets)
+        self.queue_handlers.append(handler)
+        logger.handlers = [handler]
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="rest_framework.log", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=5):
+        """
+        写完队列中已有的日志后停止后台线程
+        """
+        if self.thread is None or not self.thread.is_alive():
+            return
+        try:
+            self.queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self.thread.join(timeout)
+        self.thread = None
+
+    def after_fork(self):
+        """
+        fork出的子进程中没有后台线程，队列和handler的锁也可能处于被持有的状态，需重新创建
+        """
+        self.queue = queue.Queue(self.queue_size)
+        for handler in self.queue_handlers:
+            handler.queue = self.queue
+            handler.dropped = handler.reported = 0
+            for target in handler.targets:
+                target.createLock()
+        reset_filter_locks(self.queue_handlers)
+        self.processed = 0
+        self.start()
+
+    def run(self):
+        while True:
+            try:
+                batch = [self.queue.get(timeout=SUPPRESSED_FLUSH_INTERVAL)]
+            except queue.Empty:
+                batch = []
+            while batch and len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stopping = False
+            records = {}
+            for item in batch:
+                if item is _STOP:
+                    stopping = True
+                    continue
+                queue_handler, record = item
+                for target in queue_handler.targets:
+                    records.setdefault(target, []).append(record)
+            for target, target_records in records.items():
+                write_records(target, target_records)
+            self.processed += len(batch) - stopping
+
+            self.report_dropped()
+            # 停止时窗口未结束的也输出，避免被抑制的条数丢失
+            self.report_suppressed(force=stopping)
+            if stopping:
+                return
+
+    def report_dropped(self):
+        for handler in self.queue_handlers:
+            dropped = handler.dropped
+            if dropped == handler.reported:
+                continue
+            record = logging.makeLogRecord({
+                "name": handler.logger_name,
+                "levelno": logging.WARNING,
+                "levelname": logging.getLevelName(logging.WARNING),
+                "msg": "logging queue is full, %d records dropped" % (dropped - handler.reported),
+            })
+            handler.reported = dropped
+            for target in handler.targets:
+                write_records(target, [record])
+
+    def report_suppressed(self, force=False):
+        now = time.monotonic()
+        if not force and now - self.suppressed_flushed < SUPPRESSED_FLUSH_INTERVAL:
+            return
+        self.suppressed_flushed = now
+        flush_suppressed(self.queue_handlers, force)
+
+    def stats(self) -> dict:
+        return {
+            "queue_size": self.queue.qsize(),
+            "processed": self.processed,
+            "dropped": {handler.logger_name: handler.dropped for handler in self.queue_handlers},
+            "suppressed": {
+                handler.logger_name: sum(f.suppressed for f in handler.filters if isinstance(f, DuplicateErrorFilter))
+                for handler in self.queue_handlers
+            },
+        }
+
+
+class DuplicateErrorFilter(logging.Filter):
+    """
+    带异常的日志按异常类型、异常抛出位置和记录日志的位置去重：
+    首次完整输出，窗口期内相同的日志只计数不输出，窗口结束后的下一条照常输出并附带被抑制的条数；
+    相同的错误不再出现时，由flush_suppressed在窗口结束后单独输出被抑制的条数；
+    不带异常的日志不处理
+    """
+
+    def __init__(self, window=60, max_entries=1000):
+        """
+        :param window: 去重窗口秒数
+        :param max_entries: 最多记录的指纹数，超出后新的指纹不去重
+        """
+        super().__init__()
+        self.window = window
+        self.max_entries = max_entries
+        # 指纹: [窗口开始时间, 被抑制的条数, 首条日志的(name, levelno, levelname, pathname, lineno)]
+        self.entries = {}
+        self.suppressed = 0
+        # 记录日志的线程与定期输出的线程都会修改entries
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(record):
+        exc_type, _, tb = record.exc_info
+        while tb is not None and tb.tb_next is not None:
+            tb = tb.tb_next
+        location = (tb.tb_frame.f_code.co_filename, tb.tb_lineno) if tb is not None else None
+        return exc_type, location, record.pathname, record.lineno
+
+    def filter(self, record):
+        if not record.exc_info or record.exc_info[0] is None:
+            return True
+
+        key = self.fingerprint(record)
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and now - entry[0] < self.window:
+                entry[1] += 1
+                self.suppressed += 1
+                return False
+
+            # 同一条日志经过多个handler时只附加一次
+            if entry is not None and entry[1] and not getattr(record, "suppressed_reported", False):
+                record.msg = "%s (suppressed %s identical errors in the last %ds)" % (
+                    record.msg, "{:,}".format(entry[1]), now - entry[0])
+                record.suppressed_reported = True
+
+            if entry is None and len(self.entries) >= self.max_entries:
+                self.entries = {k: v for k, v in self.entries.items() if now - v[0] < self.window}
+                if len(self.entries) >= self.max_entries:
+                    return True
+            self.entries[key] = [now, 0, (record.name, record.levelno, record.levelname,
+                                          record.pathname, record.lineno)]
+            return True
+
+    def flush(self, force=False):
+        """
+        移除窗口已结束的指纹，其中有被抑制日志的生成汇总日志
+        :param force: 窗口未结束的也输出并移除，用于停止时
+        :return: LogRecord列表
+        """
+        now = time.monotonic()
+        records = []
+        with self.lock:
+            for key, (start, count, origin) in list(self.entries.items()):
+                if not force and now - start < self.window:
+                    continue
+                del self.entries[key]
+                if not count:
+                    continue
+                exc_type, location = key[0], key[1]
+                name, levelno, levelname, pathname, lineno = origin
+                records.append(logging.makeLogRecord({
+                    "name": name,
+                    "levelno": levelno,
+                    "levelname": levelname,
+                    "pathname": pathname,
+                    "lineno": lineno,
+                    "msg": "suppressed %s identical %s errors raised at %s:%s in the last %ds" % (
+                        "{:,}".format(count), exc_type.__name__,
+                        location[0] if location else "?", location[1] if location else "?",
+                        now - start),
+                }))
+        return records
+
+
+def flush_suppressed(handlers, force=False):
+    """
+    输出各handler上去重过滤器中窗口已结束的被抑制条数；
+    队列handler直接写入其原有的handler（在写日志的后台线程中调用）
+    """
+    for handler in handlers:
+        for log_filter in handler.filters:
+            if not isinstance(log_filter, DuplicateErrorFilter):
+                continue
+            records = log_filter.flush(force)
+            if not records:
+                continue
+            if isinstance(handler, LogQueueHandler):
+                for target in handler.targets:
+                    write_records(target, records)
+            else:
+                for record in records:
+                    if record.levelno >= handler.level:
+                        handler.handle(record)
+
+
+def reset_filter_locks(handlers):
+    # fork时其他线程可能正持有去重过滤器的锁
+    for handler in handlers:
+        for log_filter in handler.filters:
+            if isinstance(log_filter, DuplicateErrorFilter):
+                log_filter.lock = threading.Lock()
+
+
+class DedupFlusher:
+    """
+    未启用日志队列时，由单独的后台线程定期输出被抑制的条数
+    """
+
+    def __init__(self, handlers):
+        self.handlers = handlers
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="rest_framework.log.dedup", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def run(self):
+        while not self.stopped.wait(SUPPRESSED_FLUSH_INTERVAL):
+            flush_suppressed(self.handlers)
+
+    def stop(self):
+        self.stopped.set()
+        flush_suppressed(self.handlers, force=True)
+
+    def after_fork(self):
+        reset_filter_locks(self.handlers)
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="rest_framework.log.dedup", daemon=True)
+        self.start()
+
+
+def configure_logging(logging_settings, use_queue=True, queue_size=10000, batch_size=100,
+                      dedup_window=60):
+    """
+    :param logging_settings: dictConfig格式的日志配置，覆盖DEFAULT_LOGGING
+    :param use_queue: 是否把配置中各logger的handler移到后台线程写入
+    :param queue_size: 日志队列长度
+    :param batch_size: 后台线程每批最多写入的日志条数
+    :param dedup_window: 相同异常日志的去重窗口秒数，None或0表示不去重
+    """
+    global _pipeline, _dedup_flusher
+    if _pipeline is not None:
+        _pipeline.stop()
+        _pipeline = None
+    if _dedup_flusher is not None:
+        _dedup_flusher.stop()
+        _dedup_flusher = None
+
     dictConfig(DEFAULT_LOGGING)
     if logging_settings:
         dictConfig(logging_settings)
 
+    names = set(DEFAULT_LOGGING["loggers"])
+    names.update((logging_settings or {}).get("loggers", {}))
+    loggers = [logging.getLogger(name) for name in sorted(names)]
+    if "root" in (logging_settings or {}):
+        loggers.append(logging.getLogger())
+
+    if use_queue:
+        _pipeline = LogPipeline(queue_size, batch_size)
+        for logger in loggers:
+            _pipeline.wrap_logger(logger)
+        _pipeline.start()
+
+    if dedup_window:
+        # 加在队列handler上时，被抑制的日志不再复制、入队和格式化
+        handlers = {handler for logger in loggers for handler in logger.handlers}
+        for handler in handlers:
+            handler.addFilter(DuplicateErrorFilter(dedup_window))
+        if _pipeline is None:
+            _dedup_flusher = DedupFlusher(list(handlers))
+            _dedup_flusher.start()
+
+
+def reinit_after_fork():
+    """
+    在fork出的子进程中调用，重新启动写日志的后台线程
+    """
+    if _pipeline is not None:
+        _pipeline.after_fork()
+    if _dedup_flusher is not None:
+        _dedup_flusher.after_fork()
+
+
+def shutdown_logging():
+    """
+    写完队列中的日志并关闭所有handler
+    """
+    _stop_pipeline()
+    logging.shutdown()
+
+
+def logging_stats():
+    """
+    日志队列的积压、已写入及各logger丢弃的日志数，未启用队列时返回None
+    """
+    return _pipeline.stats() if _pipeline is not None else None
+
+
+def _stop_pipeline():
+    if _pipeline is not None:
+        _pipeline.stop()
+    if _dedup_flusher is not None:
+        _dedup_flusher.stop()
+
+
+# 晚于logging注册，进程退出时先于logging关闭handler执行
+atexit.register(_stop_pipeline)
+
 
 class RFLogTimedFileHandler(TimedRotatingFileHandler):
     def __init__(self, filename, when='h', interval=1, backupCount=0, encoding=None, delay=False,
@@ -131,6 +540,13 @@ class RFLogTimedFileHandler(TimedRotatingFileHandler):
 
         return result
 
+    def deleteOldFiles(self, newFileName):
+        for s in self.getFilesToDelete(newFileName):
+            try:
+                os.remove(s)
+            except:
+                pass
+
     def doRollover(self):
         if self.stream:
             self.stream.close()
@@ -144,11 +560,8 @@ class RFLogTimedFileHandler(TimedRotatingFileHandler):
         self.stream = self._open()
 
         if self.backupCount > 0:
-            for s in self.getFilesToDelete(newFileName):
-                try:
-                    os.remove(s)
-                except:
-                    pass
+            # 清理旧日志需要遍历目录，放到线程中执行，未启用日志队列时也不会阻塞事件循环
+            threading.Thread(target=self.deleteOldFiles, args=(newFileName,), daemon=True).start()
 
         newRolloverAt = self.computeRollover(currentTime)
         while newRolloverAt <= currentTime:
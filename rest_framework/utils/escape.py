@@ -1,31 +1,44 @@
-import json
+from importlib import import_module
 
-from rest_framework.core.translation import LazyString
-from rest_framework.utils import jsonlib, has_ujson
-from rest_framework.utils.transcoder import force_text
+from rest_framework.conf import settings
+from rest_framework.core.jsonbackends import AUTO_BACKENDS
+from rest_framework.core.jsonbackends.stdlib import JSONEncoder as LazyStringEncoder  # noqa: F401
 
+_backend = None
 
-class LazyStringEncoder(json.JSONEncoder):
-    def default(self, o):
-        if isinstance(o, LazyString):
-            return force_text(o)
-        else:
-            return super().default(o)
+
+def load_json_backend(name=None):
+    """
+    :param name: 后端模块路径，None时按`AUTO_BACKENDS`顺序选择第一个已安装的
+    :return: 后端Handler实例
+    """
+    if name is not None:
+        return import_module(name).Handler()
+
+    for candidate in AUTO_BACKENDS:
+        try:
+            return import_module(candidate).Handler()
+        except ImportError:
+            continue
+
+
+def get_json_backend():
+    global _backend
+    if _backend is None:
+        _backend = load_json_backend(settings.JSON_BACKEND)
+    return _backend
 
 
 def json_encode(value):
-    if not has_ujson:
-        options = {
-            "ensure_ascii": False,
-            "allow_nan": False,
-            "indent": None,
-            "separators": (",", ":"),
-            "cls": LazyStringEncoder
-        }
-        return jsonlib.dumps(value, **options)
+    return (_backend or get_json_backend()).dumps_text(value)
+
 
-    return jsonlib.dumps(value, escape_forward_slashes=False)
+def json_encode_bytes(value):
+    """
+    直接返回utf-8编码的bytes，省去`json_encode(value).encode()`的复制
+    """
+    return (_backend or get_json_backend()).dumps(value)
 
 
 def json_decode(value):
-    return jsonlib.loads(value)
+    return (_backend or get_json_backend()).loads(value)
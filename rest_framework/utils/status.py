@@ -66,6 +66,9 @@ class HttpCodeDetail(int):
 
 HTTP_200_OK = HttpCodeDetail(200, 'OK', _('Request fulfilled, document follows'))
 HTTP_201_CREATED = HttpCodeDetail(201, 'Created', _('Document created, URL follows'))
+HTTP_206_PARTIAL_CONTENT = HttpCodeDetail(206, 'PartialContent', _('Partial content follows'))
+HTTP_304_NOT_MODIFIED = HttpCodeDetail(
+    304, 'NotModified', _('Document has not changed since given time'))
 HTTP_400_BAD_REQUEST = HttpCodeDetail(
     400, 'BadRequest', _('Bad request syntax or unsupported method'))
 HTTP_401_UNAUTHORIZED = HttpCodeDetail(
@@ -76,8 +79,17 @@ HTTP_404_NOT_FOUND = HttpCodeDetail(
     404, 'NotFound', _('Nothing matches the given URI'))
 HTTP_405_METHOD_NOT_ALLOWED = HttpCodeDetail(
     405, 'MethodNotAllowed', _('Specified method is invalid for this resource'))
+HTTP_412_PRECONDITION_FAILED = HttpCodeDetail(
+    412, 'PreconditionFailed', _('Precondition in headers is false'))
+HTTP_413_REQUEST_ENTITY_TOO_LARGE = HttpCodeDetail(
+    413, 'RequestEntityTooLarge', _('Entity body is larger than the server is willing to process'))
 HTTP_415_UNSUPPORTED_MEDIA_TYPE = HttpCodeDetail(
     415, 'UnsupportedMediaType', _('Entity body in unsupported format'))
+HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE = HttpCodeDetail(
+    416, 'RequestedRangeNotSatisfiable', _('Cannot satisfy request range'))
+# 非标准状态码（nginx），客户端在响应返回前断开了连接
+HTTP_499_CLIENT_CLOSED_REQUEST = HttpCodeDetail(
+    499, 'ClientClosedRequest', _('Client closed the request before the response was sent'))
 HTTP_500_INTERNAL_SERVER_ERROR = HttpCodeDetail(
     500, 'InternalServerError', _('Server got itself in trouble'))
 HTTP_502_BAD_GATEWAY = HttpCodeDetail(
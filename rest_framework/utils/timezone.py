@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
-from datetime import datetime
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
 import pytz
 
 from rest_framework.conf import settings
@@ -11,3 +12,27 @@ def now():
     now_time = datetime.now(tz=utc)
     to_zone = pytz.timezone(settings.TIME_ZONE)
     return now_time.astimezone(to_zone)
+
+
+def http_date(value):
+    """
+    格式化为HTTP日期，如`Wed, 21 Oct 2015 07:28:00 GMT`，不带时区的按UTC处理
+    """
+    if value.tzinfo is None:
+        value = utc.localize(value)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def parse_http_date(value):
+    """
+    解析HTTP日期，格式错误时返回None
+    """
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if parsed is None:
+        return None
+    if parsed.tzinfo is None:
+        parsed = utc.localize(parsed)
+    return parsed
@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
 from rest_framework.views.generics import *
 from rest_framework.views.mixins import *
+from rest_framework.views.batch import *
 from rest_framework.views.generics import __all__ as generics_all
 from rest_framework.views.mixins import __all__ as mixin_all
+from rest_framework.views.batch import __all__ as batch_all
 
-__all__ = generics_all + mixin_all
+__all__ = generics_all + mixin_all + batch_all
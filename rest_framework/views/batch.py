@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+批量请求接口：一次请求中包含多个子请求，在进程内直接经路由分发给已有的handler，
+省去客户端多次请求的网络往返；连续的GET/HEAD子请求并发执行，其余子请求按顺序执行
+
+    urlpatterns = [url("/batch", "rest_framework.views.batch.BatchAPIHandler")]
+
+请求体为JSON数组：[{"method": "GET", "path": "/users/1", "query": {"fields": "id"}, "body": null}, ...]
+响应体为相同顺序的数组：[{"status": 200, "headers": [["content-type", "application/json"], ...], "body": ...}, ...]
+响应头为[名称, 值]列表，Set-Cookie等重复的头不会合并
+"""
+import asyncio
+from urllib.parse import urlencode, unquote
+
+from rest_framework.core import deadline, exceptions
+from rest_framework.core.codecs import JSON_MEDIA_TYPE
+from rest_framework.core.datastructures import (
+    ACCEPT, ACCEPT_ENCODING, CONTENT_LENGTH, CONTENT_TYPE, TRANSFER_ENCODING
+)
+from rest_framework.core.request import Request
+from rest_framework.core.translation import lazy_translate as _
+from rest_framework.utils import status
+from rest_framework.utils.escape import json_decode, json_encode_bytes
+from rest_framework.views.generics import BaseAPIHandler
+
+__all__ = ['BatchAPIHandler']
+
+# 子请求不继承的请求头：请求体相关的头按子请求重新生成，子响应固定为未压缩的JSON
+EXCLUDED_HEADERS = {ACCEPT, ACCEPT_ENCODING, CONTENT_LENGTH, CONTENT_TYPE, TRANSFER_ENCODING}
+CONCURRENT_METHODS = ("GET", "HEAD")
+
+
+class BatchAPIHandler(BaseAPIHandler):
+    """
+    批量请求
+    """
+    # 每次批量请求最多包含的子请求数
+    max_requests = 20
+    # 同时执行的GET/HEAD子请求数上限
+    max_concurrency = 5
+
+    async def post(self, *args, **kwargs):
+        items = self.request_data
+        if not isinstance(items, list) or not items or len(items) > self.max_requests:
+            raise exceptions.APIException(
+                detail=_('Expected a JSON array of 1 to %d requests') % self.max_requests,
+                code="BatchError",
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+
+        results = [None] * len(items)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(index, item):
+            async with semaphore:
+                results[index] = await self.dispatch_item(item)
+
+        # 每个子请求在单独的Task中执行，子handler设置的截止时间等上下文不影响批量请求及其他子请求
+        concurrent = []
+        for index, item in enumerate(items):
+            if self.get_item_method(item) in CONCURRENT_METHODS:
+                concurrent.append(deadline.create_task(run(index, item)))
+                continue
+
+            # 修改类的子请求可能依赖前面子请求的结果，等待前面的全部完成后单独执行
+            if concurrent:
+                await asyncio.gather(*concurrent)
+                concurrent = []
+            results[index] = await deadline.create_task(self.dispatch_item(item))
+
+        if concurrent:
+            await asyncio.gather(*concurrent)
+        return self.write_response(results)
+
+    @staticmethod
+    def get_item_method(item):
+        method = item.get("method", "GET") if isinstance(item, dict) else None
+        return method.upper() if isinstance(method, str) else None
+
+    def build_scope(self, item):
+        """
+        按子请求生成ASGI scope，其余信息（客户端地址、认证等请求头）继承自批量请求
+        :return: (scope, 请求体)
+        """
+        path = item.get("path") if isinstance(item, dict) else None
+        method = self.get_item_method(item)
+        if not isinstance(path, str) or not path.startswith("/") or method is None:
+            raise exceptions.APIException(
+                detail=_('Each batch request requires a `path` starting with `/`'),
+                code="BatchError",
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+
+        path, _sep, query_string = path.partition("?")
+        query = item.get("query")
+        if isinstance(query, dict):
+            query_string = urlencode(query, doseq=True)
+        elif isinstance(query, str):
+            query_string = query
+
+        headers = [(k, v) for k, v in self.request.scope["headers"] if k not in EXCLUDED_HEADERS]
+        headers.append((ACCEPT, JSON_MEDIA_TYPE.encode("latin-1")))
+        body = b""
+        if item.get("body") is not None:
+            body = json_encode_bytes(item["body"])
+            headers.append((CONTENT_TYPE, JSON_MEDIA_TYPE.encode("latin-1")))
+            headers.append((CONTENT_LENGTH, str(len(body)).encode("latin-1")))
+
+        scope = dict(self.request.scope)
+        # 不使用服务器扩展（如zerocopysend），响应体需要收集到内存中
+        scope.pop("extensions", None)
+        scope.update({
+            "method": method,
+            "path": unquote(path),
+            "raw_path": path.encode("utf-8"),
+            "root_path": "",
+            "query_string": query_string.encode("latin-1"),
+            "headers": headers,
+        })
+        return scope, body
+
+    async def dispatch_item(self, item):
+        """
+        经路由执行一个子请求
+        :return: {"status": 状态码, "headers": [[名称, 值], ...], "body": 响应体}
+        """
+        request = None
+        try:
+            scope, body = self.build_scope(item)
+            request = Request(scope, receive=self.make_receive(body))
+            match = self.application.router.get_route(request)
+            view_class = getattr(match.route.handler, "view_class", None)
+            if isinstance(view_class, type) and issubclass(view_class, BatchAPIHandler):
+                raise exceptions.APIException(
+                    detail=_('Batch requests cannot be nested'),
+                    code="BatchError",
+                    status_code=status.HTTP_400_BAD_REQUEST
+                )
+
+            # 批量请求已占用准入名额，子请求不再重复获取，避免多个批量请求占满名额后互相等待
+            response = await match.call_handler(request)
+        except Exception as e:
+            if not isinstance(e, exceptions.APIException):
+                self._record_log(status.HTTP_500_INTERNAL_SERVER_ERROR, (type(e), e, e.__traceback__))
+            response = self.pre_handle_exception(e)
+
+        try:
+            return await self.collect_response(response)
+        finally:
+            if request is not None:
+                await request.close()
+            background = getattr(response, "background", None)
+            if background is not None:
+                self.application.background.submit(background)
+
+    @staticmethod
+    def make_receive(body):
+        sent = False
+
+        async def receive():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            # 子请求没有独立的连接，不会收到断开消息
+            await asyncio.get_event_loop().create_future()
+
+        return receive
+
+    @staticmethod
+    async def collect_response(response):
+        """
+        执行ASGI响应，收集状态码、响应头和响应体
+        """
+        result = {"status": None, "headers": [], "body": None}
+        chunks = []
+
+        async def receive():
+            await asyncio.get_event_loop().create_future()
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                result["status"] = message["status"]
+                result["headers"] = [
+                    [k.decode("latin-1"), v.decode("latin-1")]
+                    for k, v in message.get("headers", []) if k != CONTENT_LENGTH
+                ]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await response(receive, send)
+        body = b"".join(chunks)
+        if body:
+            content_type = next((v for k, v in result["headers"] if k == "content-type"), "")
+            if content_type.startswith(JSON_MEDIA_TYPE):
+                result["body"] = json_decode(body)
+            else:
+                result["body"] = body.decode("utf-8", "replace")
+        return result
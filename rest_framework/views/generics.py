@@ -1,11 +1,17 @@
 # -*- coding: utf-8 -*-
 import re
 import sys
-from rest_framework.core.response import Response
+import pytz
+from rest_framework.core.response import Response, StreamingResponse, FileResponse
+from rest_framework.core.response_cache import ResponseCache
+from rest_framework.core.conditional import generate_etag, is_not_modified, not_modified_response
+from rest_framework.core.codecs import msgpack_handler
+from rest_framework.core.datastructures import HOST, USER_AGENT, CONTENT_TYPE, ETAG, VARY, UploadedFile, add_vary
 from rest_framework.core.views import RequestHandler
 from rest_framework.core import exceptions
 from rest_framework.core.exceptions import ErrorDetail, SkipFilterError, HTTPError
-from rest_framework.lib.orm import IntegrityError
+from rest_framework.lib.orm import IntegrityError, ModificationDateTimeField, fn, SQL
+from rest_framework.lib.orm.query import AsyncSelectQuery, AsyncEmptyQuery
 from rest_framework.log import app_logger
 from rest_framework.utils import timezone
 from rest_framework.utils.escape import json_encode
@@ -31,7 +37,7 @@ __all__ = [
 
 def _clean_credentials(credentials):
     """
-    屏蔽密码或密钥等重要信息
+    屏蔽密码或密钥等重要信息，上传的文件替换为文件名等简要信息，以便记录为JSON
     :param credentials:
     :return:
     """
@@ -45,6 +51,10 @@ def _clean_credentials(credentials):
         key = force_text(key)
         if sensitive_credentials.search(key):
             result[key] = cleansed_substitute
+        elif isinstance(value, UploadedFile):
+            result[key] = repr(value)
+        elif isinstance(value, list) and any(isinstance(item, UploadedFile) for item in value):
+            result[key] = [repr(item) if isinstance(item, UploadedFile) else item for item in value]
         else:
             result[key] = value
     return result
@@ -54,6 +64,9 @@ class BaseAPIHandler(RequestHandler):
     """
     基础接口处理类
     """
+    # 条件请求（ETag/304）：None不启用，"body"按响应体生成ETag，
+    # "model"按主键与修改时间字段生成（见GenericAPIHandler），If-None-Match命中时跳过序列化
+    etag_mode = None
 
     def _handle_request_exception(self, e):
         status_code = getattr(e, "status_code", status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -83,16 +96,17 @@ class BaseAPIHandler(RequestHandler):
         else:
             error_info = ""
 
+        headers = self.request.headers
         log_context = {
-            "url": self.request.url,
-            "method": self.request.method,
-            "host": self.request.headers.get("Host", ""),
+            "url": str(self.request.url),
+            "method": force_text(self.request.method),
+            "host": headers.get(HOST, ""),
             "client_ip": self.request.client_ip(),
             "request_data": params,
             "http_status_code": status_code,
             "headers": {
-                "user-agent": self.request.headers.get("User-Agent", ""),
-                "content-type": self.request.headers.get("Content-Type", "")
+                "user-agent": headers.get(USER_AGENT, ""),
+                "content-type": headers.get(CONTENT_TYPE, "")
             },
             "time_zone": settings.TIME_ZONE,
             "time": timezone.now().strftime("%Y-%m-%d %H:%M:%S.%f"),
@@ -108,17 +122,45 @@ class BaseAPIHandler(RequestHandler):
         app_logger.error(log_context, exc_info=exc_info)
 
     def write_response(self, data, status_code=status.HTTP_200_OK, headers=None,
-                       content_type="application/json", **kwargs):
+                       content_type="application/json", background=None, **kwargs):
         if isinstance(data, Response):
             return data
 
-        return Response(data, status_code=status_code, headers=headers, content_type=content_type)
+        negotiate = content_type == "application/json" and msgpack_handler is not None
+        if negotiate:
+            content_type = self.get_response_media_type()
+        response = Response(data, status_code=status_code, headers=headers, content_type=content_type,
+                            background=background)
+        if negotiate:
+            add_vary(response.headers, "Accept")
+        return response
+
+    def write_not_modified(self, etag=None, last_modified=None):
+        """
+        write_response对应的304，带上200响应会有的Vary
+        """
+        return not_modified_response(etag, last_modified, vary="Accept" if msgpack_handler is not None else None)
+
+    def write_file(self, path, filename=None, content_type=None, headers=None):
+        """
+        发送磁盘文件，支持Range断点续传
+        :param path: 文件路径
+        :param filename: 下载文件名，设置时浏览器作为附件下载
+        :param content_type: 默认按文件名猜测
+        :param headers:
+        :return: FileResponse
+        """
+        return FileResponse(path, request=self.request, headers=headers,
+                            content_type=content_type, filename=filename)
 
     def write_error(self, content, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR):
         if isinstance(content, Response):
             return content
 
-        return Response(content, status_code=status_code)
+        response = Response(content, status_code=status_code, content_type=self.get_response_media_type())
+        if msgpack_handler is not None:
+            add_vary(response.headers, "Accept")
+        return response
 
     def pre_handle_exception(self, exc):
         """
@@ -165,7 +207,33 @@ class BaseAPIHandler(RequestHandler):
 
         return error_response
 
-    def finalize_response(self, response, *args, **kwargs):
+    def negotiate(self, response):
+        # 在按Accept重新渲染之后生成ETag，与实际发送的响应体一致
+        response = super().negotiate(response)
+        if self.etag_mode is not None:
+            return self.apply_body_etag(response)
+        return response
+
+    def apply_body_etag(self, response):
+        """
+        GET请求的200响应按响应体（压缩前）生成ETag，与If-None-Match匹配时返回304；已经设置ETag的响应不处理
+        """
+        if not isinstance(response, Response) or isinstance(response, (StreamingResponse, FileResponse)):
+            return response
+        if response.status_code != status.HTTP_200_OK or self.request.method not in (b"GET", b"HEAD"):
+            return response
+
+        headers = response.headers
+        if ETAG in headers:
+            return response
+
+        etag = generate_etag(response.body)
+        if is_not_modified(self.request, etag):
+            not_modified = not_modified_response(etag, vary=headers.get(VARY))
+            not_modified.background = response.background
+            return not_modified
+
+        headers[ETAG] = etag
         return response
 
 
@@ -182,6 +250,10 @@ class GenericAPIHandler(BaseAPIHandler):
     lookup_url_kwarg = None
     # 分页处理类
     pagination_class = "rest_framework.core.pagination.PageNumberPagination"
+    # 列表流式返回的格式：None不启用，"json"逐块输出JSON数组，"ndjson"每行一个JSON对象；启用后不分页
+    stream_format = None
+    # 流式返回时每块包含的记录数
+    stream_chunk_size = 100
     # 修改或创建是否序列化实例对象返回, False代表只返回主键值，True代表返回实例对象
     need_obj_serializer = False
     # 查询过滤处理类，主要是搜索、过滤
@@ -200,6 +272,14 @@ class GenericAPIHandler(BaseAPIHandler):
     initial = {}
     filter_class = None
     filter_fields = ()
+    # 响应缓存秒数：None不缓存，需每个handler单独开启；GET/HEAD的200响应渲染后整体缓存，
+    # 命中时仍执行prepare，不再执行handler和序列化；
+    # 带Authorization或Cookie头的请求不缓存，除非`response_cache_vary`中包含对应的请求头
+    response_cache_timeout = None
+    # 响应缓存使用的缓存别名（settings.CACHES）
+    response_cache_alias = "default"
+    # 影响响应内容、需要加入缓存key的请求头
+    response_cache_vary = ("Accept", "Accept-Language")
 
     def get_initial(self):
         """
@@ -230,11 +310,27 @@ class GenericAPIHandler(BaseAPIHandler):
             queryset = queryset.select()
         return queryset
 
+    @classmethod
+    def build_dispatch_plan(cls):
+        plan = super().build_dispatch_plan()
+        plan.filter_backends = [
+            import_object(backend) for backend in cls.filter_backend_list if backend is not None
+        ]
+        plan.pagination_class = import_object(cls.pagination_class)
+        if cls.response_cache_timeout is not None:
+            plan.response_cache = ResponseCache(
+                cls.response_cache_timeout, cls.response_cache_alias, cls.response_cache_vary
+            )
+        return plan
+
     @cached_property
     def load_filter_class(self):
         """
+        查询过滤处理类，使用分发计划中已导入的类；实例上修改了`filter_backend_list`时重新导入
         :return:
         """
+        if self.filter_backend_list is type(self).filter_backend_list:
+            return self.get_dispatch_plan().filter_backends
         return [import_object(backend) for backend in self.filter_backend_list if backend is not None]
 
     async def filter_queryset(self, queryset):
@@ -296,6 +392,69 @@ class GenericAPIHandler(BaseAPIHandler):
 
         return obj
 
+    @staticmethod
+    def get_modification_field(model_class):
+        for field in model_class._meta.sorted_fields:
+            if isinstance(field, ModificationDateTimeField):
+                return field
+        return None
+
+    def get_object_validators(self, instance):
+        """
+        按表名、主键、修改时间及响应格式生成单个对象的(ETag, Last-Modified)，
+        model没有ModificationDateTimeField时返回(None, None)
+        """
+        field = self.get_modification_field(type(instance))
+        modified = None if field is None else getattr(instance, field.name, None)
+        if modified is None:
+            return None, None
+
+        if modified.tzinfo is None:
+            modified = pytz.timezone(field.time_zone).localize(modified)
+        meta = instance._meta
+        # 响应格式不同时响应体不同，与列表一样加入ETag
+        etag = generate_etag(meta.db_table, getattr(instance, meta.primary_key.name), modified.isoformat(),
+                             self.get_response_media_type())
+        return etag, modified
+
+    async def get_queryset_validators(self, queryset):
+        """
+        用一条`MAX(修改时间), COUNT(1)`查询生成列表的(ETag, Last-Modified)，
+        增删改都会改变最大修改时间或记录数；无法生成时返回(None, None)
+        """
+        if not isinstance(queryset, AsyncSelectQuery) or isinstance(queryset, AsyncEmptyQuery):
+            return None, None
+        field = self.get_modification_field(queryset.model_class)
+        if field is None or queryset._group_by or queryset._distinct:
+            return None, None
+
+        clone = queryset.clone()
+        clone._select = [fn.MAX(field), fn.COUNT(SQL("1"))]
+        clone._order_by = None
+        modified, count = await clone.scalar(as_tuple=True)
+        if modified is not None and modified.tzinfo is None:
+            modified = pytz.timezone(field.time_zone).localize(modified)
+
+        # 分页、字段等查询参数及响应格式不同时响应体不同，一并加入ETag
+        sql, params = queryset.sql()
+        query = sorted(self.request.query_params.items())
+        etag = generate_etag(sql, params, count, modified.isoformat() if modified else "",
+                             query, self.get_response_media_type())
+        return etag, modified
+
+    async def get_object_etag(self, instance):
+        """
+        对象当前的ETag，与查看详情接口返回的ETag一致，用于If-Match
+        """
+        if self.etag_mode == "model":
+            etag, _ = self.get_object_validators(instance)
+            if etag is not None:
+                return etag
+
+        # 与查看详情接口一样按Accept渲染，msgpack客户端的If-Match也能匹配
+        serializer = self.get_serializer(instance=instance)
+        return generate_etag(self.write_response(await serializer.data).body)
+
     def get_serializer(self, *args, **kwargs):
         """
         实例化序列处理类返回
@@ -363,7 +522,11 @@ class GenericAPIHandler(BaseAPIHandler):
         分页处理实例对象，如没配置返回None,反之对应的实例
         """
         if not hasattr(self, '_paginator'):
-            paginator = None if self.pagination_class is None else import_object(self.pagination_class)()
+            if self.pagination_class is type(self).pagination_class:
+                pagination_class = self.get_dispatch_plan().pagination_class
+            else:
+                pagination_class = import_object(self.pagination_class)
+            paginator = None if pagination_class is None else pagination_class()
             setattr(self, "_paginator", paginator)
 
         return self._paginator
@@ -1,7 +1,13 @@
 # -*- coding: utf-8 -*-
 from rest_framework import serializers
-from rest_framework.core.exceptions import SkipFilterError
-from rest_framework.lib.orm.query import AsyncEmptyQuery
+from rest_framework.core.conditional import (
+    is_not_modified, is_precondition_failed, set_validators
+)
+from rest_framework.core.datastructures import IF_MATCH
+from rest_framework.core.exceptions import SkipFilterError, PreconditionFailed
+from rest_framework.core.response import StreamingResponse
+from rest_framework.lib.orm.query import AsyncEmptyQuery, AsyncSelectQuery
+from rest_framework.utils.escape import json_encode_bytes
 from rest_framework.utils import status
 
 
@@ -71,14 +77,82 @@ class ListModelMixin:
         except SkipFilterError:
             queryset = AsyncEmptyQuery()
 
+        etag, last_modified = None, None
+        if self.etag_mode == "model":
+            etag, last_modified = await self.get_queryset_validators(queryset)
+            if is_not_modified(self.request, etag, last_modified):
+                return self.write_not_modified(etag, last_modified)
+
+        if self.stream_format is not None:
+            return set_validators(self.stream_response(queryset), etag, last_modified)
+
         page = await self.paginate_queryset(queryset)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
-            return await self.write_paginated_response(await serializer.data)
+            response = await self.write_paginated_response(await serializer.data)
+        else:
+            serializer = self.get_serializer(queryset, many=True)
+            response = self.write_response(await serializer.data)
+
+        return set_validators(response, etag, last_modified)
+
+    def stream_response(self, queryset):
+        """
+        逐条查询、序列化并分块输出，内存占用只与`stream_chunk_size`有关，与结果集大小无关
+        :param queryset:
+        :return: StreamingResponse
+        """
+        if self.stream_format == "ndjson":
+            content = self.iter_ndjson(queryset)
+            content_type = "application/x-ndjson"
+        elif self.stream_format == "json":
+            content = self.iter_json_array(queryset)
+            content_type = "application/json"
+        else:
+            raise ValueError("Unsupported stream_format: %r" % self.stream_format)
+
+        return StreamingResponse(content, content_type=content_type)
+
+    async def iter_queryset(self, queryset):
+        if isinstance(queryset, AsyncEmptyQuery):
+            return
+
+        if isinstance(queryset, AsyncSelectQuery):
+            # 服务端游标逐行读取且不缓存结果，内存占用与结果集大小无关
+            async for row in queryset.stream():
+                yield row
+        else:
+            for row in queryset:
+                yield row
 
-        serializer = self.get_serializer(queryset, many=True)
+    async def iter_serialized(self, queryset):
+        """
+        每次产生`stream_chunk_size`条已编码的记录
+        """
+        serializer = self.get_serializer()
+        chunk_size = self.stream_chunk_size
+        rows = []
+        async for instance in self.iter_queryset(queryset):
+            rows.append(json_encode_bytes(await serializer.to_representation(instance)))
+            if len(rows) >= chunk_size:
+                yield rows
+                rows = []
 
-        return self.write_response(await serializer.data)
+        if rows:
+            yield rows
+
+    async def iter_json_array(self, queryset):
+        separator = b"["
+        async for rows in self.iter_serialized(queryset):
+            yield separator + b",".join(rows)
+            separator = b","
+
+        yield b"]" if separator == b"," else b"[]"
+
+    async def iter_ndjson(self, queryset):
+        async for rows in self.iter_serialized(queryset):
+            rows.append(b"")
+            yield b"\n".join(rows)
 
 
 class RetrieveModelMixin:
@@ -87,8 +161,14 @@ class RetrieveModelMixin:
     """
     async def retrieve(self, *args, **kwargs):
         instance = await self.get_object()
+        etag, last_modified = None, None
+        if self.etag_mode == "model":
+            etag, last_modified = self.get_object_validators(instance)
+            if is_not_modified(self.request, etag, last_modified):
+                return self.write_not_modified(etag, last_modified)
+
         serializer = self.get_serializer(instance=instance)
-        return self.write_response(await serializer.data)
+        return set_validators(self.write_response(await serializer.data), etag, last_modified)
 
 
 class UpdateModelMixin:
@@ -97,6 +177,7 @@ class UpdateModelMixin:
     """
     async def update(self, *args, **kwargs):
         obj_instance = await self.get_object()
+        await self.check_if_match(obj_instance)
         form = self.get_form(empty_permitted=True, instance=obj_instance)
         if await form.is_valid():
             instance = await self.perform_update(form)
@@ -112,6 +193,16 @@ class UpdateModelMixin:
 
         return self.write_response(data=await form.errors, status_code=status.HTTP_400_BAD_REQUEST)
 
+    async def check_if_match(self, instance):
+        """
+        乐观并发控制：请求头If-Match与对象当前的ETag不一致时返回412
+        """
+        if self.request.headers.get(IF_MATCH) is None:
+            return
+
+        if is_precondition_failed(self.request, await self.get_object_etag(instance)):
+            raise PreconditionFailed()
+
     async def perform_update(self, form):
         instance = await form.save()
         return instance
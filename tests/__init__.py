@@ -0,0 +1,3 @@
+import os
+
+os.environ.setdefault("TORNADO_REST_SETTINGS_MODULE", "tests.settings")
@@ -0,0 +1 @@
+ROOT_URLCONF = "tests.urls"
@@ -0,0 +1,45 @@
+import asyncio
+import json
+import unittest
+
+from rest_framework.core.application import get_application
+
+
+class BatchTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.app = get_application()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def batch(self, items):
+        sent = []
+        body = json.dumps(items).encode()
+
+        async def receive():
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            "type": "http", "method": "POST", "path": "/batch", "root_path": "", "query_string": b"",
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        }
+        self.loop.run_until_complete(self.app(scope)(receive, send))
+        self.assertEqual(sent[0]["status"], 200)
+        return json.loads(b"".join(m.get("body", b"") for m in sent[1:]).decode())
+
+    def test_repeated_headers_are_kept(self):
+        result = self.batch([{"method": "GET", "path": "/cookies"}])
+        headers = result[0]["headers"]
+        self.assertEqual(result[0]["status"], 200)
+        self.assertEqual([v for k, v in headers if k == "set-cookie"], ["a=1", "b=2"])
+        self.assertEqual(result[0]["body"], {"ok": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
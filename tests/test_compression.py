@@ -0,0 +1,55 @@
+import asyncio
+import unittest
+
+from rest_framework.core.compression import compress_response
+from rest_framework.core.request import Request
+from rest_framework.core.response import StreamingResponse
+
+
+class ClientDisconnect(Exception):
+    pass
+
+
+class CompressStreamTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_disconnect_closes_inner_iterator(self):
+        closed = []
+
+        async def rows():
+            try:
+                for i in range(100):
+                    yield b'{"id": %d}' % i
+            finally:
+                closed.append(True)
+
+        scope = {
+            "type": "http", "method": "GET", "path": "/", "root_path": "", "query_string": b"",
+            "headers": [(b"accept-encoding", b"gzip")],
+        }
+        response = compress_response(Request(scope), StreamingResponse(rows()))
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+
+        sent = []
+
+        async def receive():
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+            if len(sent) > 2:
+                raise ClientDisconnect()
+
+        with self.assertRaises(ClientDisconnect):
+            self.loop.run_until_complete(response(receive, send))
+        self.assertEqual(closed, [True])
+
+
+if __name__ == "__main__":
+    unittest.main()
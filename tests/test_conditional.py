@@ -0,0 +1,48 @@
+import asyncio
+import unittest
+
+from rest_framework.core.application import get_application
+
+
+class NotModifiedTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.app = get_application()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def request(self, path, headers):
+        sent = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            "type": "http", "method": "GET", "path": path, "root_path": "", "query_string": b"",
+            "headers": headers,
+        }
+        self.loop.run_until_complete(self.app(scope)(receive, send))
+        return sent[0]["status"], dict(sent[0]["headers"])
+
+    def test_not_modified_keeps_vary(self):
+        status_code, headers = self.request("/etag", [(b"accept-encoding", b"gzip")])
+        self.assertEqual(status_code, 200)
+        vary = headers[b"vary"]
+
+        status_code, headers = self.request("/etag", [
+            (b"accept-encoding", b"gzip"), (b"if-none-match", headers[b"etag"]),
+        ])
+        self.assertEqual(status_code, 304)
+        self.assertEqual(headers[b"vary"], vary)
+        self.assertIn(b"Accept", vary)
+        self.assertIn(b"Accept-Encoding", vary)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import asyncio
+import unittest
+
+from rest_framework.core.application import get_application
+from tests import urls
+
+
+class StreamingDeadlineTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.app = get_application()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def request(self, path):
+        sent = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            "type": "http", "method": "GET", "path": path, "root_path": "", "query_string": b"",
+            "headers": [],
+        }
+        self.loop.run_until_complete(self.app(scope)(receive, send))
+        return sent
+
+    def test_deadline_cleared_before_body(self):
+        del urls.stream_deadlines[:]
+        sent = self.request("/stream")
+        self.assertEqual(sent[0]["status"], 200)
+        self.assertEqual(urls.stream_deadlines, [None])
+        self.assertFalse(sent[-1]["more_body"])
+
+    def test_deadline_exceeded_while_streaming(self):
+        sent = self.request("/stream/expired")
+        self.assertEqual(sent[0]["status"], 200)
+        self.assertEqual([m["body"] for m in sent[1:]], [b"["])
+        self.assertTrue(all(m["more_body"] for m in sent[1:]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import asyncio
+import unittest
+
+from uvicorn.lifespan import Lifespan
+
+from rest_framework.core import singnals
+from rest_framework.core.application import get_application
+
+
+class BrokenReceiverError(Exception):
+    pass
+
+
+def broken_receiver(sender, **kwargs):
+    raise BrokenReceiverError("boom")
+
+
+class LifespanTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.app = get_application()
+        singnals.app_started.connect(broken_receiver)
+
+    def tearDown(self):
+        singnals.app_started.disconnect(broken_receiver)
+        self.loop.close()
+
+    def test_startup_error_is_raised(self):
+        sent = []
+
+        async def receive():
+            return {"type": "lifespan.startup"}
+
+        async def send(message):
+            sent.append(message)
+
+        instance = self.app({"type": "lifespan"})
+        with self.assertRaises(BrokenReceiverError):
+            self.loop.run_until_complete(instance(receive, send))
+        self.assertEqual(sent, [])
+
+    def test_uvicorn_reports_startup_error(self):
+        lifespan = Lifespan(self.app)
+
+        async def run():
+            task = self.loop.create_task(lifespan.run())
+            await lifespan.wait_startup()
+            await task
+
+        self.loop.run_until_complete(run())
+        self.assertTrue(lifespan.error_occured)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+from rest_framework.core import deadline
+from rest_framework.core.exceptions import DeadlineExceeded
+from rest_framework.core.response import StreamingResponse
+from rest_framework.core.urls import url
+from rest_framework.core.views import RequestHandler
+from rest_framework.views.generics import BaseAPIHandler
+
+# 响应体生成时看到的剩余时间
+stream_deadlines = []
+
+
+class StreamHandler(RequestHandler):
+    request_timeout = 5
+
+    async def get(self):
+        async def rows():
+            stream_deadlines.append(deadline.remaining())
+            yield b"[]"
+
+        return StreamingResponse(rows())
+
+
+class ExpiredStreamHandler(RequestHandler):
+
+    async def get(self):
+        async def rows():
+            yield b"["
+            raise DeadlineExceeded()
+
+        return StreamingResponse(rows())
+
+
+class BodyETagHandler(BaseAPIHandler):
+    etag_mode = "body"
+    compress_response = True
+
+    async def get(self):
+        return self.write_response({"id": 1})
+
+
+class CookieHandler(BaseAPIHandler):
+
+    async def get(self):
+        response = self.write_response({"ok": 1})
+        response.raw_headers.append((b"set-cookie", b"a=1"))
+        response.raw_headers.append((b"set-cookie", b"b=2"))
+        return response
+
+
+urlpatterns = [
+    url("/stream", StreamHandler),
+    url("/stream/expired", ExpiredStreamHandler),
+    url("/etag", BodyETagHandler),
+    url("/cookies", CookieHandler),
+    url("/batch", "rest_framework.views.batch.BatchAPIHandler"),
+]